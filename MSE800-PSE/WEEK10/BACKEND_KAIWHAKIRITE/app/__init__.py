@@ -4,6 +4,7 @@ from flask_login import LoginManager
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from datetime import timedelta
+import click
 import os
 from dotenv import load_dotenv
 
@@ -15,37 +16,178 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 jwt = JWTManager()
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     
     # Configure application
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # "default" or "production" (WAL, tuned pragmas, pooling); see app/database.py
+    app.config['DB_PROFILE'] = os.getenv('DB_PROFILE', 'default')
+    for name in ['SQLITE_JOURNAL_MODE', 'SQLITE_SYNCHRONOUS', 'SQLITE_CACHE_SIZE',
+                 'SQLITE_MMAP_SIZE', 'SQLITE_BUSY_TIMEOUT', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW']:
+        app.config[name] = os.getenv(name)
     app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+    app.config['BARCODE_CACHE_SIZE'] = int(os.getenv('BARCODE_CACHE_SIZE', 4096))
+    app.config['BARCODE_CACHE_TTL'] = float(os.getenv('BARCODE_CACHE_TTL', 300))
+    # Listing cache: in-process by default, shared across workers with CACHE_URL=redis://...
+    app.config['CACHE_URL'] = os.getenv('CACHE_URL')
+    app.config['LISTING_CACHE_SIZE'] = int(os.getenv('LISTING_CACHE_SIZE', 256))
+    app.config['LISTING_CACHE_TTL'] = float(os.getenv('LISTING_CACHE_TTL', 60))
+    app.config['LISTING_CACHE_MAX_BYTES'] = int(os.getenv('LISTING_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+    # Server-sent events at /api/events (see app/events.py)
+    app.config['EVENTS_HISTORY'] = int(os.getenv('EVENTS_HISTORY', 1000))
+    app.config['EVENTS_QUEUE_SIZE'] = int(os.getenv('EVENTS_QUEUE_SIZE', 256))
+    app.config['EVENTS_MAX_SUBSCRIBERS'] = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 500))
+    app.config['EVENTS_HEARTBEAT'] = float(os.getenv('EVENTS_HEARTBEAT', 15))
+    # "direct" commits each POST /api/transactions itself; "group" hands it to
+    # one writer thread that commits many per fsync (see app/write_queue.py)
+    app.config['STOCK_WRITE_MODE'] = os.getenv('STOCK_WRITE_MODE', 'direct')
+    app.config['GROUP_COMMIT_MAX_BATCH'] = int(os.getenv('GROUP_COMMIT_MAX_BATCH', 256))
+    app.config['GROUP_COMMIT_MAX_WAIT'] = float(os.getenv('GROUP_COMMIT_MAX_WAIT', 0))
+    app.config['GROUP_COMMIT_QUEUE'] = int(os.getenv('GROUP_COMMIT_QUEUE', 10000))
+    # werkzeug method string, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1";
+    # stored hashes made with other parameters are upgraded at next login
+    app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 32))
+    
+    # Explicit overrides (used by the test suite)
+    if config:
+        app.config.update(config)
     
     # Initialize CORS
     CORS(app)
     
+    # Connection settings for the selected database profile
+    from app.database import apply_pragmas, database_settings
+    pragmas, engine_options = database_settings(app.config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    
     # Initialize extensions with app
     db.init_app(app)
     login_manager.init_app(app)
     jwt.init_app(app)
     
+    # Per-endpoint query counts and latency histograms at /api/_metrics
+    from app.metrics import install_metrics
+    
+    with app.app_context():
+        apply_pragmas(db.engine, pragmas)
+        install_metrics(app, db.engine)
+    
+    # Per-process cache in front of GET /api/products/barcode/<barcode>
+    from app.cache import LRUCache, create_listing_cache
+    app.extensions['barcode_cache'] = LRUCache(
+        maxsize=app.config['BARCODE_CACHE_SIZE'],
+        ttl=app.config['BARCODE_CACHE_TTL']
+    )
+    
+    # Product, supplier and low-stock listings (see app/etags.py)
+    app.extensions['listing_cache'] = create_listing_cache(
+        url=app.config['CACHE_URL'],
+        maxsize=app.config['LISTING_CACHE_SIZE'],
+        ttl=app.config['LISTING_CACHE_TTL']
+    )
+    
+    # Stock and low-stock notifications pushed to connected clients
+    from app.events import EventBroker
+    app.extensions['event_broker'] = EventBroker(
+        history=app.config['EVENTS_HISTORY'],
+        queue_size=app.config['EVENTS_QUEUE_SIZE'],
+        max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS']
+    )
+    
+    # Password hashing is kept off the request threads' CPU budget
+    from app.passwords import PasswordHasher
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_limit=app.config['PASSWORD_HASH_QUEUE']
+    )
+    
+    # Optional group commit of stock movements
+    if app.config['STOCK_WRITE_MODE'] == 'group':
+        from app.write_queue import GroupCommitWriter
+        app.extensions['stock_writer'] = GroupCommitWriter(
+            app,
+            max_batch=app.config['GROUP_COMMIT_MAX_BATCH'],
+            max_wait=app.config['GROUP_COMMIT_MAX_WAIT'],
+            queue_limit=app.config['GROUP_COMMIT_QUEUE']
+        )
+    
     # Import and register blueprints
     from app.routes.auth import auth_bp
     from app.routes.products import products_bp
     from app.routes.suppliers import suppliers_bp
     from app.routes.transactions import transactions_bp
+    from app.routes.events import events_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(products_bp, url_prefix='/api/products')
     app.register_blueprint(suppliers_bp, url_prefix='/api/suppliers')
     app.register_blueprint(transactions_bp, url_prefix='/api/transactions')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
+    
+    # Create database tables and add any columns/indexes missing from older databases
+    from app.schema import upgrade_schema
     
-    # Create database tables
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        # FTS5 index behind GET /api/products/search (SQLite only)
+        from app.search import ensure_product_search
+        app.extensions['product_search'] = ensure_product_search()
+    
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Create missing tables, columns and indexes in an existing database."""
+        db.create_all()
+        changes = upgrade_schema()
+        from app.search import ensure_product_search
+        ensure_product_search()
+        print(f'Applied {len(changes)} change(s): {", ".join(changes) or "none"}')
+    
+    @app.cli.command('snapshot-stock')
+    def snapshot_stock_command():
+        """Record every product's current quantity (run once per period)."""
+        from app.snapshots import take_stock_snapshot
+        taken_at, rows = take_stock_snapshot()
+        print(f'Snapshot of {rows} product(s) taken at {taken_at.isoformat()}')
+    
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Recompute the daily/weekly movement rollups from all transactions."""
+        from app.rollups import rebuild_rollups
+        rebuild_rollups()
+        print('Movement rollups rebuilt')
+    
+    @app.cli.command('seed')
+    @click.option('--users', default=10, show_default=True)
+    @click.option('--suppliers', default=50, show_default=True)
+    @click.option('--products', default=1000, show_default=True)
+    @click.option('--transactions', default=10000, show_default=True)
+    @click.option('--days', default=730, show_default=True, help='History spread over this many days.')
+    @click.option('--seed', default=1, show_default=True, help='Random seed, for repeatable data.')
+    def seed_command(users, suppliers, products, transactions, days, seed):
+        """Add synthetic users, suppliers, products and transactions for load testing."""
+        from app.seed import seed_database
+        counts = seed_database(users, suppliers, products, transactions, days, seed, progress=print)
+        print('Seeded ' + ', '.join(f'{count} {table}' for table, count in counts.items()))
+    
+    @app.cli.command('archive')
+    @click.option('--product-days', default=90, show_default=True,
+                  help='Archive products soft-deleted more than this many days ago.')
+    @click.option('--transaction-days', default=365, show_default=True,
+                  help='Archive transactions older than this many days.')
+    def archive_command(product_days, transaction_days):
+        """Move old transactions and long-deleted products to the archive tables."""
+        from app.archive import archive_stale_rows
+        products, transactions = archive_stale_rows(product_days, transaction_days)
+        print(f'Archived {products} product(s) and {transactions} transaction(s)')
     
     return app
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, func, insert, select, union_all
+from app import db
+from app.models.models import (ArchivedProduct, ArchivedStockTransaction, Product,
+                               StockSnapshot, StockTransaction, TableVersion)
+
+PRODUCT_FIELDS = ['id', 'name', 'description', 'quantity', 'category', 'unit', 'threshold',
+                  'supplier_id', 'barcode', 'created_at', 'updated_at', 'row_version',
+                  'is_deleted', 'is_low_stock']
+TRANSACTION_FIELDS = ['id', 'product_id', 'user_id', 'type', 'quantity', 'date', 'notes']
+
+def _below_newest(table):
+    # The row with the highest id always stays: SQLite hands out max(id) + 1,
+    # so removing it could give a new row an id that is already archived
+    return table.c.id < select(func.max(table.c.id)).scalar_subquery()
+
+def _move(source, target, fields, condition, archived_at):
+    # Copy the matching rows into the archive table, then delete them
+    columns = [source.c[name] for name in fields]
+    db.session.execute(insert(target).from_select(
+        fields + ['archived_at'],
+        select(*columns, db.literal(archived_at, db.DateTime)).where(condition)
+    ))
+    return db.session.execute(delete(source).where(condition)).rowcount
+
+def archive_stale_rows(product_days=90, transaction_days=365):
+    """Move old history out of the hot tables; returns (products, transactions) moved.
+
+    Transactions dated more than transaction_days ago go first. A product is
+    then archived once it has been soft-deleted for product_days and none of
+    its transactions are left in the hot table; its stock snapshots are
+    dropped with it. Everything happens in one transaction, so readers see
+    each row in exactly one of the two tables.
+    """
+    now = datetime.utcnow()
+    transactions = StockTransaction.__table__
+    products = Product.__table__
+
+    moved_transactions = _move(
+        transactions, ArchivedStockTransaction.__table__, TRANSACTION_FIELDS,
+        db.and_(transactions.c.date < now - timedelta(days=transaction_days),
+                _below_newest(transactions)),
+        now
+    )
+
+    stale = db.and_(
+        products.c.is_deleted == True,
+        products.c.updated_at < now - timedelta(days=product_days),
+        ~exists().where(transactions.c.product_id == products.c.id),
+        _below_newest(products)
+    )
+    db.session.execute(delete(StockSnapshot).where(
+        StockSnapshot.product_id.in_(select(products.c.id).where(stale))
+    ))
+    moved_products = _move(products, ArchivedProduct.__table__, PRODUCT_FIELDS, stale, now)
+
+    if moved_products:
+        TableVersion.bump('products')
+    db.session.commit()
+    return moved_products, moved_transactions
+
+def all_products():
+    """Hot and archived products as one selectable with the products columns."""
+    return union_all(
+        select(*[Product.__table__.c[name] for name in PRODUCT_FIELDS]),
+        select(*[ArchivedProduct.__table__.c[name] for name in PRODUCT_FIELDS])
+    ).subquery('all_products')
+
+def archive_horizon():
+    """Date of the newest archived transaction, or None if nothing is archived."""
+    return db.session.execute(select(func.max(ArchivedStockTransaction.date))).scalar()
+
+def transactions_since(start=None):
+    """Selectable of the transactions a query starting at start has to read.
+
+    Only the hot table while start is after everything archived; otherwise a
+    union with the archive, so old date ranges (or no range) see all history.
+    """
+    table = StockTransaction.__table__
+    horizon = archive_horizon()
+    if horizon is None or (start is not None and start > horizon):
+        return table
+    return union_all(
+        select(*[table.c[name] for name in TRANSACTION_FIELDS]),
+        select(*[ArchivedStockTransaction.__table__.c[name] for name in TRANSACTION_FIELDS])
+    ).subquery('all_transactions')
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from threading import Lock, Thread
+import math
+import time
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with an optional per-entry TTL.
+
+    Hit and miss counters are kept so the cache can be sized from real
+    traffic (see stats()). A maxsize of 0 disables caching entirely.
+
+    Every invalidation advances a generation counter. A reader that fills
+    the cache from the database takes generation() before its query and
+    passes it to set(); if a write invalidated anything in between, the
+    value may predate that write and is not stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > self.clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        if self.maxsize <= 0:
+            return
+        expires = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+class LocalCache:
+    """In-process listing cache: one LRUCache per namespace (e.g. 'products').
+
+    Only the worker that performs a write can invalidate it, which is enough
+    for a single process. Use RedisCache when running several workers.
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._namespaces = {}
+        self._lock = Lock()
+
+    def _namespace(self, namespace):
+        with self._lock:
+            cache = self._namespaces.get(namespace)
+            if cache is None:
+                cache = self._namespaces[namespace] = LRUCache(self.maxsize, self.ttl)
+            return cache
+
+    def get(self, namespace, key):
+        return self._namespace(namespace).get(key)
+
+    def set(self, namespace, key, value):
+        self._namespace(namespace).set(key, value)
+
+    def invalidate(self, namespace):
+        self._namespace(namespace).clear()
+
+    def stats(self):
+        with self._lock:
+            namespaces = dict(self._namespaces)
+        return {'backend': 'local',
+                'namespaces': {name: cache.stats() for name, cache in namespaces.items()}}
+
+class RedisCache:
+    """Listing cache shared by all workers through a Redis-protocol server.
+
+    Entries live in one hash per namespace, with a small LocalCache in front
+    so hot listings are served from memory. invalidate() deletes the
+    namespace's hash and publishes the namespace on a channel; every worker
+    runs listen() and drops its local copies when a message arrives. Server
+    errors are treated as misses, so an unreachable cache only costs speed.
+    """
+
+    def __init__(self, client, ttl=60, local_size=64, prefix='kaiwhakarite'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.channel = f'{prefix}:invalidate'
+        self.local = LocalCache(local_size, ttl)
+        self.errors = 0
+
+    def _key(self, namespace):
+        return f'{self.prefix}:listing:{namespace}'
+
+    def get(self, namespace, key):
+        value = self.local.get(namespace, key)
+        if value is None:
+            try:
+                value = self.client.hget(self._key(namespace), key)
+            except Exception:
+                self.errors += 1
+                return None
+            if value is not None:
+                self.local.set(namespace, key, value)
+        return value
+
+    def set(self, namespace, key, value):
+        self.local.set(namespace, key, value)
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.hset(self._key(namespace), key, value)
+            if self.ttl:
+                pipeline.expire(self._key(namespace), int(math.ceil(self.ttl)))
+            pipeline.execute()
+        except Exception:
+            self.errors += 1
+
+    def invalidate(self, namespace):
+        self.local.invalidate(namespace)
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.delete(self._key(namespace))
+            pipeline.publish(self.channel, namespace)
+            pipeline.execute()
+        except Exception:
+            self.errors += 1
+
+    def listen(self):
+        """Start the background thread that applies other workers' invalidations."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        thread = Thread(target=self._listen, args=(pubsub,), name='cache-invalidation',
+                        daemon=True)
+        thread.start()
+        return thread
+
+    def _listen(self, pubsub):
+        for message in pubsub.listen():
+            if message.get('type') != 'message':
+                continue
+            namespace = message['data']
+            if isinstance(namespace, bytes):
+                namespace = namespace.decode()
+            self.local.invalidate(namespace)
+
+    def stats(self):
+        return {'backend': 'redis', 'errors': self.errors, 'local': self.local.stats()}
+
+def create_listing_cache(url=None, maxsize=256, ttl=60):
+    """LocalCache, or a listening RedisCache when url (redis://...) is given."""
+    if not url:
+        return LocalCache(maxsize, ttl)
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('CACHE_URL is set but the redis package is not installed')
+    cache = RedisCache(redis.Redis.from_url(url), ttl=ttl, local_size=maxsize)
+    cache.listen()
+    return cache
@@ -0,0 +1,61 @@
+from flask import Response, current_app, request
+from hashlib import sha1
+import json
+from app.models.models import TableVersion
+
+def listing_etag(*tables):
+    """Strong ETag for a listing of tables as requested by the current request.
+
+    Built from each table's version counter plus everything that shapes the
+    representation (path, query string and negotiated mimetype), so it only
+    needs primary-key reads of table_versions.
+    """
+    accept = request.accept_mimetypes.to_header() or '*/*'
+    versions = ':'.join(f'{table}:{TableVersion.current(table)}' for table in tables)
+    key = f'{versions}:{request.full_path}:{accept}'
+    return sha1(key.encode()).hexdigest()
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds etag, else None."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+# Response headers that are part of a cached listing besides its body
+CACHED_HEADERS = ['Content-Type', 'X-Next-After']
+
+def _pack(response):
+    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+    return json.dumps(headers).encode() + b'\n' + response.get_data()
+
+def _unpack(value):
+    headers, _, body = value.partition(b'\n')
+    return Response(body, headers=json.loads(headers))
+
+def cached_listing(namespace, etag, build):
+    """Serve a listing from the shared listing cache, or build() and store it.
+
+    Entries are keyed by the listing's ETag, which already changes with every
+    write to the tables behind it, so a worker can never serve a listing
+    older than the database; invalidation only frees the superseded entries.
+    build() returns the Response to send when nothing is cached.
+    """
+    cache = current_app.extensions['listing_cache']
+    value = cache.get(namespace, etag)
+    if value is not None:
+        response = _unpack(value)
+    else:
+        response = build()
+        if (response.status_code == 200 and
+                response.content_length <= current_app.config['LISTING_CACHE_MAX_BYTES']):
+            cache.set(namespace, etag, _pack(response))
+    response.set_etag(etag)
+    return response
+
+def invalidate_listings(*namespaces):
+    """Drop cached listings of namespaces in every worker; call after commit."""
+    cache = current_app.extensions['listing_cache']
+    for namespace in namespaces:
+        cache.invalidate(namespace)
@@ -0,0 +1,128 @@
+from collections import deque
+from queue import Empty, Full, Queue
+from threading import Lock
+from flask import current_app
+import json
+import time
+
+# How long EventSource clients wait before reconnecting
+RECONNECT_MS = 3000
+
+class BrokerFull(Exception):
+    pass
+
+class Subscriber:
+    def __init__(self, queue_size):
+        self.queue = Queue(maxsize=queue_size)
+        # set by the broker when the client falls too far behind
+        self.closed = False
+
+class EventBroker:
+    """Fans stock events out from the writing requests to every SSE client.
+
+    Each event is encoded once as an SSE frame and put on every subscriber's
+    queue, so a thousand connected tablets cost no more database work than
+    one. The last `history` frames are kept so a client that reconnects with
+    Last-Event-ID gets exactly what it missed. A client whose queue fills up
+    is disconnected rather than slowing the writers down; it reconnects and
+    catches up from the history. When the history no longer reaches back far
+    enough (or the id is from before a restart) the client gets a `refresh`
+    event instead and should reload its listings.
+    """
+
+    def __init__(self, history=1000, queue_size=256, max_subscribers=500):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        # ids are "<epoch>-<sequence>"; the epoch tells ids of an earlier run apart
+        self._epoch = format(time.time_ns() // 1000000, 'x')
+        self._sequence = 0
+        self._history = deque(maxlen=history)  # (sequence, frame)
+        self._subscribers = set()
+        self._lock = Lock()
+        self.published = 0
+        self.disconnected = 0
+
+    def _frame(self, sequence, event, payload):
+        return f'id: {self._epoch}-{sequence}\nevent: {event}\ndata: {payload}\n\n'.encode()
+
+    def publish(self, event, data):
+        payload = json.dumps(data, separators=(',', ':'))
+        with self._lock:
+            self._sequence += 1
+            frame = self._frame(self._sequence, event, payload)
+            self._history.append((self._sequence, frame))
+            self.published += 1
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.queue.put_nowait(frame)
+                except Full:
+                    subscriber.closed = True
+                    self._subscribers.discard(subscriber)
+                    self.disconnected += 1
+
+    def _parse_id(self, last_event_id):
+        epoch, _, sequence = (last_event_id or '').partition('-')
+        if epoch != self._epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber; returns it with the frames to send first."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull()
+            subscriber = Subscriber(self.queue_size)
+            self._subscribers.add(subscriber)
+
+            if not last_event_id:
+                # Fresh connection: give the client an id to resume from
+                return subscriber, [self._frame(self._sequence, 'ready', '{}')]
+            sequence = self._parse_id(last_event_id)
+            oldest = self._history[0][0] if self._history else self._sequence + 1
+            if sequence is None or sequence > self._sequence or sequence + 1 < oldest:
+                return subscriber, [self._frame(self._sequence, 'refresh', '{"reason":"resume"}')]
+            return subscriber, [frame for seq, frame in self._history if seq > sequence]
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stream(self, subscriber, backlog, heartbeat=15):
+        """Yield SSE frames for one client until it disconnects or is cut off."""
+        try:
+            yield f'retry: {RECONNECT_MS}\n\n'.encode()
+            yield from backlog
+            while not (subscriber.closed and subscriber.queue.empty()):
+                try:
+                    yield subscriber.queue.get(timeout=heartbeat)
+                except Empty:
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield b': keep-alive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'disconnected': self.disconnected,
+                'history': len(self._history),
+            }
+
+def publish_stock_change(product_id, quantity, threshold, low_stock, was_low_stock,
+                         quantity_changed=True):
+    """Publish a committed product change to the event stream.
+
+    Sends `stock` when the quantity changed and `low-stock` when the product
+    crossed its threshold (or left the alert by being deleted). Call after
+    the commit, with values captured before it, so no event is published for
+    a rolled-back write and no expired attribute is reloaded.
+    """
+    broker = current_app.extensions['event_broker']
+    if quantity_changed:
+        broker.publish('stock', {'product_id': product_id, 'quantity': quantity,
+                                 'low_stock': low_stock})
+    if low_stock != was_low_stock:
+        broker.publish('low-stock', {'product_id': product_id, 'quantity': quantity,
+                                     'threshold': threshold, 'low_stock': low_stock})
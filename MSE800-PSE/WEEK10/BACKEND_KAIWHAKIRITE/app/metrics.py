@@ -0,0 +1,171 @@
+from bisect import bisect_left
+from threading import Lock
+import time
+from flask import Response, g, has_app_context, request
+from sqlalchemy import event
+
+PREFIX = 'kaiwhakarite'
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# name -> (help, buckets) of the per-endpoint histograms
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time spent in the request handler.', LATENCY_BUCKETS),
+    'db_time_seconds': ('Total time spent executing SQL per request.', LATENCY_BUCKETS),
+    'db_queries_per_request': ('SQL statements executed per request.', QUERY_BUCKETS),
+}
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+def _labels(**labels):
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """Per-endpoint request, query and latency metrics in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._requests = {}
+        self._queries = {}
+        self._histograms = {}
+
+    def observe_request(self, endpoint, method, status, handler_seconds, queries, db_seconds):
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._queries[(endpoint, method)] = self._queries.get((endpoint, method), 0) + queries
+            for name, value in [('http_request_duration_seconds', handler_seconds),
+                                ('db_time_seconds', db_seconds),
+                                ('db_queries_per_request', queries)]:
+                histogram = self._histograms.get((name, endpoint, method))
+                if histogram is None:
+                    histogram = Histogram(HISTOGRAMS[name][1])
+                    self._histograms[(name, endpoint, method)] = histogram
+                histogram.observe(value)
+
+    def render(self):
+        with self._lock:
+            lines = [
+                f'# HELP {PREFIX}_http_requests_total Requests handled.',
+                f'# TYPE {PREFIX}_http_requests_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                labels = _labels(endpoint=endpoint, method=method, status=status)
+                lines.append(f'{PREFIX}_http_requests_total{{{labels}}} {count}')
+
+            lines += [
+                f'# HELP {PREFIX}_db_queries_total SQL statements executed.',
+                f'# TYPE {PREFIX}_db_queries_total counter',
+            ]
+            for (endpoint, method), count in sorted(self._queries.items()):
+                labels = _labels(endpoint=endpoint, method=method)
+                lines.append(f'{PREFIX}_db_queries_total{{{labels}}} {count}')
+
+            for name, (help, buckets) in HISTOGRAMS.items():
+                metric = f'{PREFIX}_{name}'
+                lines += [f'# HELP {metric} {help}', f'# TYPE {metric} histogram']
+                for (histogram_name, endpoint, method), histogram in sorted(self._histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    labels = _labels(endpoint=endpoint, method=method)
+                    cumulative = 0
+                    for bound, count in zip(buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{labels},le="{_number(bound)}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{{labels}}} {_number(histogram.sum)}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and 'request_metrics' in g:
+        context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is not None and has_app_context() and 'request_metrics' in g:
+        metrics = g.request_metrics
+        metrics['queries'] += 1
+        metrics['db_seconds'] += time.perf_counter() - started
+
+def _event_metrics(stats):
+    # Server-sent event broker (app/events.py)
+    lines = []
+    for name, type, help, value in [
+        ('sse_subscribers', 'gauge', 'Connected event stream clients.', stats['subscribers']),
+        ('sse_events_published_total', 'counter', 'Events published.', stats['published']),
+        ('sse_disconnected_total', 'counter', 'Clients cut off for falling behind.',
+         stats['disconnected']),
+    ]:
+        lines += [f'# HELP {PREFIX}_{name} {help}', f'# TYPE {PREFIX}_{name} {type}',
+                  f'{PREFIX}_{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+def install_metrics(app, engine):
+    """Count SQL and time every request of app; serve the results at /api/_metrics.
+
+    Statements are attributed to the request whose thread runs them, via the
+    engine's cursor-execute events. Handler time ends when the view returns;
+    queries of a streamed body are still counted, up to request teardown.
+    """
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = {'started': time.perf_counter(), 'queries': 0, 'db_seconds': 0.0}
+
+    @app.after_request
+    def stop_request_timer(response):
+        metrics = g.get('request_metrics')
+        if metrics is not None:
+            metrics['handler_seconds'] = time.perf_counter() - metrics['started']
+            metrics['status'] = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request_metrics(exc):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return
+        registry.observe_request(
+            # unmatched URLs share one label so scanners cannot grow the series
+            endpoint=request.endpoint or 'unmatched',
+            method=request.method,
+            status=metrics.get('status', 500),
+            handler_seconds=metrics.get('handler_seconds',
+                                        time.perf_counter() - metrics['started']),
+            queries=metrics['queries'],
+            db_seconds=metrics['db_seconds']
+        )
+
+    def export_metrics():
+        text = registry.render()
+        broker = app.extensions.get('event_broker')
+        if broker is not None:
+            text += _event_metrics(broker.stats())
+        return Response(text, mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/api/_metrics', 'metrics', export_metrics)
+    return registry
@@ -1,7 +1,7 @@
 from app import db
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -12,11 +12,44 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False)  # rangatira/kaimahi
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Hashing runs on the app's bounded PasswordHasher pool (app/passwords.py)
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = current_app.extensions['password_hasher'].hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return current_app.extensions['password_hasher'].verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return current_app.extensions['password_hasher'].needs_rehash(self.password_hash)
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    # One counter per table, bumped in the same transaction as every write
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def bump(cls, name):
+        updated = db.session.execute(
+            db.update(cls).where(cls.name == name).values(version=cls.version + 1)
+        ).rowcount
+        if not updated:
+            # Executed now, not at flush, so Product.row_version sees it
+            db.session.execute(db.insert(cls).values(name=name, version=1))
+    
+    @classmethod
+    def current(cls, name):
+        return db.session.execute(
+            db.select(cls.version).where(cls.name == name)
+        ).scalar() or 0
+
+# The products counter as of the current transaction. Stamped into every
+# product row written; because the counter is bumped first, under the write
+# lock, rows are stamped in commit order (see Product.row_version)
+_products_version = db.func.coalesce(
+    db.select(TableVersion.version).where(TableVersion.name == 'products').scalar_subquery(), 0
+)
 
 class Supplier(db.Model):
     __tablename__ = 'suppliers'
@@ -43,7 +76,48 @@ class Product(db.Model):
     supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.id'))
     barcode = db.Column(db.String(100), unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # set on every write, including Core UPDATEs
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # table_versions['products'] of the write, also on Core UPDATEs; writers
+    # must TableVersion.bump('products') before touching products. Drives
+    # GET /api/products/changes: unlike updated_at (taken when the statement
+    # is built) it cannot commit out of order
+    row_version = db.Column(db.Integer, nullable=False, server_default='0',
+                            default=_products_version, onupdate=_products_version)
     is_deleted = db.Column(db.Boolean, default=False)  # for soft delete
+    # live product at or below its threshold; kept current by refresh_low_stock()
+    is_low_stock = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    
+    __table_args__ = (
+        # Only low-stock rows are in here, so the alert query reads nothing else
+        db.Index('ix_products_is_low_stock', id, sqlite_where=is_low_stock == True),
+        db.Index('ix_products_supplier_id', supplier_id),
+        db.Index('ix_products_updated_at_id', updated_at, id),
+        db.Index('ix_products_row_version_id', row_version, id),
+    )
+    
+    @staticmethod
+    def is_low(quantity, threshold, is_deleted=False):
+        return (
+            not is_deleted
+            and quantity is not None
+            and threshold is not None
+            and quantity <= threshold
+        )
+    
+    def refresh_low_stock(self):
+        self.is_low_stock = Product.is_low(self.quantity, self.threshold, self.is_deleted)
+    
+    @classmethod
+    def low_stock_expression(cls, quantity=None):
+        # SQL counterpart of refresh_low_stock() for set-based UPDATEs; pass the
+        # new quantity expression when it is being changed in the same UPDATE
+        quantity = cls.quantity if quantity is None else quantity
+        return db.case(
+            (db.and_(db.func.coalesce(cls.is_deleted, False) == False,
+                     quantity <= cls.threshold), True),
+            else_=False
+        )
 
 class StockTransaction(db.Model):
     __tablename__ = 'stock_transactions'
@@ -56,5 +130,90 @@ class StockTransaction(db.Model):
     date = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)
     
+    __table_args__ = (
+        db.Index('ix_stock_transactions_product_id_date', product_id, date),
+        db.Index('ix_stock_transactions_date', date),
+        db.Index('ix_stock_transactions_type_date', type, date),
+    )
+    
     product = db.relationship('Product', backref='transactions')
     user = db.relationship('User', backref='transactions')
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+    
+    # Quantity of every product at the moment a periodic snapshot was taken
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_stock_snapshots_product_id_taken_at', product_id, taken_at, unique=True),
+    )
+
+class StockMovementRollup(db.Model):
+    __tablename__ = 'stock_movement_rollups'
+    
+    # Units moved per product per day/week and type, kept current by
+    # app.rollups as transactions are recorded. product_id 0 holds the
+    # all-products total for the period.
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(4), nullable=False)  # 'day' or 'week'
+    period_start = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.String(10), nullable=False)  # 'in' or 'out'
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_stock_movement_rollups_key',
+                 period, product_id, period_start, type, unique=True),
+        # Covers the forecast's read of every product's daily outflow (app/forecast.py)
+        db.Index('ix_stock_movement_rollups_period_type_start',
+                 period, type, period_start, product_id, quantity),
+    )
+
+class ArchivedProduct(db.Model):
+    __tablename__ = 'products_archive'
+    
+    # Soft-deleted products moved out of the hot table by app.archive; same
+    # columns as products, without constraints, plus when it was moved
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text)
+    quantity = db.Column(db.Integer)
+    category = db.Column(db.String(50))
+    unit = db.Column(db.String(20))
+    threshold = db.Column(db.Integer)
+    supplier_id = db.Column(db.Integer)
+    barcode = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    # kept so GET /api/products/changes still sends the tombstone
+    row_version = db.Column(db.Integer, nullable=False, server_default='0')
+    is_deleted = db.Column(db.Boolean)
+    is_low_stock = db.Column(db.Boolean, nullable=False, default=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_products_archive_row_version_id', row_version, id),
+    )
+
+class ArchivedStockTransaction(db.Model):
+    __tablename__ = 'stock_transactions_archive'
+    
+    # Transactions older than the archive cutoff, moved out by app.archive
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    product_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)
+    type = db.Column(db.String(10), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime)
+    notes = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_stock_transactions_archive_product_id_date', product_id, date),
+        db.Index('ix_stock_transactions_archive_date', date),
+    )
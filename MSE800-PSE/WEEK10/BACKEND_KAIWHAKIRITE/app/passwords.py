@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    Hashing is deliberately slow and CPU bound. Capping it at `workers`
+    threads means a burst of logins can only occupy that many cores while
+    the request threads serving everything else keep running. At most
+    `queue_limit` more hashes may be queued; beyond that callers wait up to
+    `wait_timeout` seconds for room and then get PasswordHasherBusy, so the
+    caller can shed load instead of piling up.
+    """
+
+    def __init__(self, method='pbkdf2', workers=2, queue_limit=32, wait_timeout=10):
+        self.method = method
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='password-hasher')
+        self._slots = BoundedSemaphore(workers + queue_limit)
+        self._prefix = None
+        self._prefix_lock = Lock()
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if password_hash was made with different parameters than configured."""
+        if self._prefix is None:
+            with self._prefix_lock:
+                if self._prefix is None:
+                    # werkzeug fills in defaults (e.g. "pbkdf2" -> "pbkdf2:sha256:600000"),
+                    # so learn the full prefix from one real hash
+                    self._prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.archive import transactions_since
+from app.models.models import StockMovementRollup
+
+ALL_PRODUCTS = 0
+PERIODS = ('day', 'week')
+
+def period_start(period, moment):
+    day = moment.date()
+    return day if period == 'day' else day - timedelta(days=day.weekday())
+
+def _upsert():
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    statement = insert(StockMovementRollup)
+    return statement.on_conflict_do_update(
+        index_elements=['period', 'product_id', 'period_start', 'type'],
+        set_={
+            'quantity': StockMovementRollup.quantity + statement.excluded.quantity,
+            'count': StockMovementRollup.count + statement.excluded.count
+        }
+    )
+
+def add_to_rollups(movements):
+    """Fold (product_id, type, quantity, date) movements into the rollups.
+
+    Movements are pre-aggregated per rollup row so a batch of any size costs
+    one executemany upsert. Runs in the caller's transaction.
+    """
+    totals = {}
+    for product_id, type, quantity, date in movements:
+        for period in PERIODS:
+            start = period_start(period, date)
+            for scope in (product_id, ALL_PRODUCTS):
+                key = (period, start, scope, type)
+                total = totals.setdefault(key, [0, 0])
+                total[0] += quantity
+                total[1] += 1
+
+    if totals:
+        db.session.execute(_upsert(), [{
+            'period': period,
+            'period_start': start,
+            'product_id': product_id,
+            'type': type,
+            'quantity': quantity,
+            'count': count
+        } for (period, start, product_id, type), (quantity, count) in totals.items()])
+
+def rebuild_rollups():
+    """Recompute every rollup row from all transactions, archived ones included.
+
+    Uses SQLite date functions.
+    """
+    transactions = transactions_since()
+    db.session.execute(delete(StockMovementRollup))
+    starts = {
+        'day': func.date(transactions.c.date),
+        'week': func.date(transactions.c.date, 'weekday 0', '-6 days')
+    }
+    for period, start in starts.items():
+        for per_product in (True, False):
+            scope = transactions.c.product_id if per_product else db.literal(ALL_PRODUCTS)
+            query = select(db.literal(period), start, scope, transactions.c.type,
+                           func.sum(transactions.c.quantity), func.count())
+            query = query.group_by(start, transactions.c.type)
+            if per_product:
+                query = query.group_by(transactions.c.product_id)
+            db.session.execute(StockMovementRollup.__table__.insert().from_select(
+                ['period', 'period_start', 'product_id', 'type', 'quantity', 'count'], query
+            ))
+    db.session.commit()
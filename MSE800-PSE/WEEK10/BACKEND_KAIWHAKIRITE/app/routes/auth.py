@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.models.models import User
 from app import db
+from app.passwords import PasswordHasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -18,7 +19,10 @@ def register():
         username=data['username'],
         role=data.get('role', 'kaimahi')  # Default to kaimahi if role not specified
     )
-    user.set_password(data['password'])
+    try:
+        user.set_password(data['password'])
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     
     # Only allow rangatira role if no users exist (first user)
     if user.role == 'rangatira' and User.query.count() > 0:
@@ -34,7 +38,16 @@ def login():
     data = request.get_json()
     user = User.query.filter_by(username=data['username']).first()
     
-    if user and user.check_password(data['password']):
+    try:
+        valid = user is not None and user.check_password(data['password'])
+        # Transparently move old hashes to the configured parameters
+        if valid and user.password_needs_rehash():
+            user.set_password(data['password'])
+            db.session.commit()
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+    
+    if valid:
         access_token = create_access_token(identity={
             'user_id': user.id,
             'username': user.username,
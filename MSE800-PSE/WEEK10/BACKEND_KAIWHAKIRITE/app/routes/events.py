@@ -0,0 +1,27 @@
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_jwt_extended import jwt_required
+from app.events import BrokerFull
+
+events_bp = Blueprint('events', __name__)
+
+# EventSource cannot set an Authorization header, so the token may also be
+# passed as ?jwt=<token>
+@events_bp.route('/', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    broker = current_app.extensions['event_broker']
+    # Browsers resend the last id they saw in Last-Event-ID when reconnecting
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        subscriber, backlog = broker.subscribe(last_event_id)
+    except BrokerFull:
+        return jsonify({'error': 'Too many event subscribers, fall back to polling'}), 503
+    
+    response = Response(
+        broker.stream(subscriber, backlog, current_app.config['EVENTS_HEARTBEAT']),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Also covers a client that goes away before the first frame is sent
+    response.call_on_close(lambda: broker.unsubscribe(subscriber))
+    return response
@@ -1,22 +1,36 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.models import Product, Supplier
+from app.models.models import Product, Supplier, TableVersion
 from app import db
+from datetime import datetime
+from sqlalchemy import select
+from app.events import publish_stock_change
+from app.etags import cached_listing, invalidate_listings, listing_etag, not_modified
+from app.serializers import fetch_rows, json_response
+from app.archive import all_products
+from app.search import match_expression, ranked_hits
+import csv
+import io
+import json
 
 products_bp = Blueprint('products', __name__)
 
-@products_bp.route('/', methods=['GET'])
-@jwt_required()
-def get_products():
-    # Include option to filter deleted products
-    include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
-    query = Product.query
-    
-    if not include_deleted:
-        query = query.filter_by(is_deleted=False)
-    
-    products = query.all()
-    return jsonify([{
+MAX_PAGE_SIZE = 1000
+SEARCH_LIMIT = 50
+SEARCH_MAX_CANDIDATES = 50000
+FORECAST_MAX_DAYS = 730
+IMPORT_CHUNK_SIZE = 500
+IMPORT_INT_FIELDS = ['quantity', 'threshold', 'supplier_id']
+IMPORT_TEXT_FIELDS = ['name', 'description', 'category', 'unit', 'barcode']
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Columns of a product in listings, selected as plain rows (see app/serializers.py)
+PRODUCT_COLUMNS = [Product.id, Product.name, Product.description, Product.quantity,
+                   Product.category, Product.unit, Product.threshold, Product.supplier_id,
+                   Product.barcode, Product.is_deleted]
+
+def _serialize_product(p):
+    return {
         'id': p.id,
         'name': p.name,
         'description': p.description,
@@ -27,7 +41,199 @@ def get_products():
         'supplier_id': p.supplier_id,
         'barcode': p.barcode,
         'is_deleted': p.is_deleted
-    } for p in products]), 200
+    }
+
+def _barcode_cache():
+    return current_app.extensions['barcode_cache']
+
+def _parse_page_args():
+    # Keyset pagination on Product.id: ?limit=<n>&after=<last id seen>
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    try:
+        limit = int(limit) if limit is not None else None
+        after = int(after) if after is not None else None
+    except ValueError:
+        raise ValueError('limit and after must be integers')
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit, after
+
+@products_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_products():
+    # Include option to filter deleted products
+    include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
+    try:
+        limit, after = _parse_page_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Nothing has been written since the client's copy: skip query and encoding
+    etag = listing_etag('products')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # Long-deleted products may have been moved to the archive table
+    source = all_products() if include_deleted else Product.__table__
+    statement = select(*[source.c[column.key] for column in PRODUCT_COLUMNS])
+    
+    if not include_deleted:
+        statement = statement.where(source.c.is_deleted == False)
+    if after is not None:
+        statement = statement.where(source.c.id > after)
+    statement = statement.order_by(source.c.id)
+    if limit is not None:
+        statement = statement.limit(limit)
+    
+    # Opt-in streaming: one JSON document per line, read from a server-side
+    # cursor so memory stays flat regardless of catalog size
+    best = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE])
+    if best == NDJSON_MIMETYPE:
+        def generate():
+            result = db.session.execute(statement.execution_options(yield_per=500))
+            for row in result.mappings():
+                yield json.dumps(dict(row), separators=(',', ':')) + '\n'
+        response = Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+        response.set_etag(etag)
+        return response
+    
+    def build():
+        products = fetch_rows(statement)
+        response = json_response(products)
+        if limit is not None and len(products) == limit:
+            response.headers['X-Next-After'] = str(products[-1]['id'])
+        return response
+    
+    return cached_listing('products', etag, build), 200
+
+def _parse_watermark(value):
+    # Watermark is "<row_version>,<id>" of the last change seen. Watermarks of
+    # the earlier "<updated_at>,<id>" format restart the sync from scratch.
+    version, _, product_id = value.rpartition(',')
+    try:
+        return int(version), int(product_id)
+    except ValueError:
+        datetime.fromisoformat(version)
+        int(product_id)
+        return None
+
+@products_bp.route('/changes', methods=['GET'])
+@jwt_required()
+def get_product_changes():
+    # Delta sync: everything written after the watermark, oldest first
+    try:
+        since = request.args.get('since')
+        since = _parse_watermark(since) if since else None
+        limit = int(request.args.get('limit', MAX_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'Invalid since or limit'}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    
+    # Archived products included, so a client that last synced before a
+    # product was deleted and archived still gets its tombstone
+    source = all_products()
+    query = select(source)
+    if since:
+        query = query.where(db.tuple_(source.c.row_version, source.c.id) > db.tuple_(*since))
+    products = db.session.execute(
+        query.order_by(source.c.row_version, source.c.id).limit(limit)
+    ).all()
+    
+    changes = []
+    for p in products:
+        if p.is_deleted:
+            # Tombstone: clients only need to know the row is gone
+            change = {'id': p.id, 'is_deleted': True}
+        else:
+            change = _serialize_product(p)
+        change['updated_at'] = p.updated_at.isoformat()
+        changes.append(change)
+    
+    if products:
+        last = products[-1]
+        next_since = f'{last.row_version},{last.id}'
+    else:
+        next_since = request.args.get('since')
+    
+    return jsonify({
+        'changes': changes,
+        'next_since': next_since,
+        'has_more': len(products) == limit
+    }), 200
+
+@products_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_products():
+    # Ranked full-text search; every word matches as a prefix ("choc milk")
+    if not current_app.extensions.get('product_search'):
+        return jsonify({'error': 'Full-text search is not available on this database'}), 501
+    
+    match = match_expression(request.args.get('q', ''))
+    if not match:
+        return jsonify({'error': 'q is required'}), 400
+    include_deleted = request.args.get('include_deleted', 'false').lower() == 'true'
+    try:
+        limit = int(request.args.get('limit', SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    
+    # Take the best-ranked hits straight from the index and join only those
+    # back to products. Soft-deleted rows can push live ones out of the first
+    # window, so widen it until the page is full or the index runs out.
+    candidates = limit if include_deleted else limit * 2
+    while True:
+        hits = ranked_hits(match, candidates)
+        statement = select(*PRODUCT_COLUMNS).join(hits, hits.c.id == Product.id)
+        if not include_deleted:
+            statement = statement.where(Product.is_deleted == False)
+        products = fetch_rows(statement.order_by(hits.c.score, Product.id).limit(limit))
+        if len(products) == limit or candidates >= SEARCH_MAX_CANDIDATES:
+            break
+        if db.session.execute(select(db.func.count()).select_from(hits)).scalar() < candidates:
+            break
+        candidates *= 4
+    
+    return json_response(products), 200
+
+@products_bp.route('/forecast', methods=['GET'])
+@jwt_required()
+def get_product_forecast():
+    # Predicted stock-out date and reorder point per live product, most urgent first
+    from app import forecast
+    if forecast.np is None:
+        return jsonify({'error': 'Forecasting requires numpy to be installed'}), 501
+    
+    try:
+        days = int(request.args.get('days', 90))
+        span = int(request.args.get('span', 30))
+        lead_time = int(request.args.get('lead_time', 7))
+        service_level = float(request.args.get('service_level', 0.95))
+        limit = int(request.args.get('limit', 100))
+        product_id = int(request.args['product_id']) if 'product_id' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'days, span, lead_time, service_level, limit and product_id'
+                                 ' must be numbers'}), 400
+    method = request.args.get('method', 'ema')
+    if method not in ('ema', 'sma'):
+        return jsonify({'error': 'method must be ema or sma'}), 400
+    if not 1 <= days <= FORECAST_MAX_DAYS or span < 1 or lead_time < 0:
+        return jsonify({'error': f'days must be between 1 and {FORECAST_MAX_DAYS}, span at least 1'
+                                 ' and lead_time not negative'}), 400
+    if service_level not in forecast.SERVICE_LEVELS:
+        levels = ', '.join(str(level) for level in forecast.SERVICE_LEVELS)
+        return jsonify({'error': f'service_level must be one of: {levels}'}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    
+    return json_response(forecast.forecast_stock(
+        days=days, method=method, span=span, lead_time=lead_time,
+        service_level=service_level, product_id=product_id, limit=limit
+    )), 200
 
 @products_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -48,15 +254,109 @@ def create_product():
         supplier_id=data.get('supplier_id'),
         barcode=data['barcode']
     )
+    product.refresh_low_stock()
+    state = (product.quantity, product.threshold, product.is_low_stock)
     
+    # Bumped before the row is written so it is stamped with the new version
+    TableVersion.bump('products')
     db.session.add(product)
     db.session.commit()
+    invalidate_listings('products')
+    _barcode_cache().invalidate(data['barcode'])
+    product_id = product.id
+    publish_stock_change(product_id, *state, was_low_stock=False)
     
     return jsonify({
         'message': 'Product created successfully',
-        'product_id': product.id
+        'product_id': product_id
     }), 201
 
+def _import_chunk(chunk, report):
+    # One IN query finds every barcode of the chunk that is already taken
+    barcodes = {row['barcode'] for _, row in chunk}
+    taken = set(db.session.execute(
+        select(Product.barcode).where(Product.barcode.in_(barcodes))
+    ).scalars())
+    
+    rows = []
+    for line, row in chunk:
+        if row['barcode'] in taken:
+            report['skipped'].append({'line': line, 'barcode': row['barcode']})
+            continue
+        taken.add(row['barcode'])
+        row['is_low_stock'] = Product.is_low(row['quantity'], row['threshold'])
+        rows.append(row)
+    
+    if rows:
+        TableVersion.bump('products')
+        db.session.execute(Product.__table__.insert(), rows)
+        report['imported'] += len(rows)
+    # Commit before reading on: holding the write lock while the rest of the
+    # upload streams in would block every other writer for the whole file
+    db.session.commit()
+    if rows:
+        invalidate_listings('products')
+
+@products_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_products():
+    # CSV with a header row; name and barcode are required columns. Accepts a
+    # multipart upload in "file" or a raw text/csv body, read as a stream.
+    upload = request.files.get('file')
+    stream = io.TextIOWrapper(upload.stream if upload else request.stream,
+                              encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(stream)
+    try:
+        fieldnames = reader.fieldnames
+    except (UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': f'Could not read the CSV header: {e}'}), 400
+    
+    if not fieldnames or not {'name', 'barcode'} <= set(fieldnames):
+        return jsonify({'error': 'CSV must have a header with name and barcode columns'}), 400
+    
+    report = {'imported': 0, 'skipped': [], 'errors': []}
+    chunk = []
+    error = None
+    try:
+        for line, record in enumerate(reader, start=2):
+            row = {field: (record.get(field) or '').strip() or None
+                   for field in IMPORT_TEXT_FIELDS}
+            if not row['name'] or not row['barcode']:
+                report['errors'].append({'line': line, 'error': 'name and barcode are required'})
+                continue
+            try:
+                for field in IMPORT_INT_FIELDS:
+                    value = (record.get(field) or '').strip()
+                    row[field] = int(value) if value else None
+            except ValueError:
+                report['errors'].append({'line': line, 'error': f'{field} must be an integer'})
+                continue
+            row['quantity'] = row['quantity'] or 0
+            
+            chunk.append((line, row))
+            if len(chunk) == IMPORT_CHUNK_SIZE:
+                _import_chunk(chunk, report)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Earlier chunks are already committed, so say how far the file got
+        # and let the client resend from there
+        error = e
+    if chunk:
+        _import_chunk(chunk, report)
+    
+    if report['imported']:
+        # One event for the whole file; clients reload their listings
+        current_app.extensions['event_broker'].publish('refresh', {'reason': 'import'})
+    
+    if error is not None:
+        # A decode error loses the whole line it falls in; a csv.Error is
+        # raised after the offending line has been counted
+        stopped_at_line = reader.line_num + (1 if isinstance(error, UnicodeDecodeError) else 0)
+        return jsonify({'error': f'Could not read the CSV at line {stopped_at_line}: {error}',
+                        'stopped_at_line': stopped_at_line, **report}), 400
+    
+    return jsonify(report), 201
+
 @products_bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_product(id):
@@ -68,13 +368,23 @@ def update_product(id):
         if Product.query.filter_by(barcode=data['barcode']).first():
             return jsonify({'error': 'Product with this barcode already exists'}), 400
     
+    barcodes = {product.barcode, data.get('barcode', product.barcode)}
+    old_quantity, was_low_stock = product.quantity, product.is_low_stock
+    TableVersion.bump('products')
+    
     # Update fields
     for field in ['name', 'description', 'quantity', 'category', 'unit', 
                  'threshold', 'supplier_id', 'barcode']:
         if field in data:
             setattr(product, field, data[field])
+    product.refresh_low_stock()
+    state = (product.quantity, product.threshold, product.is_low_stock)
     
     db.session.commit()
+    invalidate_listings('products')
+    _barcode_cache().invalidate(*barcodes)
+    publish_stock_change(id, *state, was_low_stock=was_low_stock,
+                         quantity_changed=state[0] != old_quantity)
     return jsonify({'message': 'Product updated successfully'}), 200
 
 @products_bp.route('/<int:id>', methods=['DELETE'])
@@ -83,8 +393,16 @@ def delete_product(id):
     product = Product.query.get_or_404(id)
     
     # Implement soft delete
+    TableVersion.bump('products')
+    was_low_stock = product.is_low_stock
     product.is_deleted = True
+    product.refresh_low_stock()
+    barcode = product.barcode
+    state = (product.quantity, product.threshold, product.is_low_stock)
     db.session.commit()
+    invalidate_listings('products')
+    _barcode_cache().invalidate(barcode)
+    publish_stock_change(id, *state, was_low_stock=was_low_stock, quantity_changed=False)
     
     return jsonify({'message': 'Product deleted successfully'}), 200
 
@@ -94,20 +412,37 @@ def restore_product(id):
     product = Product.query.get_or_404(id)
     
     # Restore soft deleted product
+    TableVersion.bump('products')
+    was_low_stock = product.is_low_stock
     product.is_deleted = False
+    product.refresh_low_stock()
+    barcode = product.barcode
+    state = (product.quantity, product.threshold, product.is_low_stock)
     db.session.commit()
+    invalidate_listings('products')
+    _barcode_cache().invalidate(barcode)
+    publish_stock_change(id, *state, was_low_stock=was_low_stock, quantity_changed=False)
     
     return jsonify({'message': 'Product restored successfully'}), 200
 
 @products_bp.route('/barcode/<barcode>', methods=['GET'])
 @jwt_required()
 def get_product_by_barcode(barcode):
+    # Hottest endpoint (every till scan); writes invalidate the cached entry
+    cache = _barcode_cache()
+    cached = cache.get(barcode)
+    if cached is not None:
+        return jsonify(cached), 200
+    
+    # Taken before the read: a write that commits and invalidates while the
+    # query runs makes the set() below a no-op instead of caching old data
+    generation = cache.generation()
     product = Product.query.filter_by(barcode=barcode, is_deleted=False).first()
     
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
-    return jsonify({
+    data = {
         'id': product.id,
         'name': product.name,
         'description': product.description,
@@ -117,4 +452,14 @@ def get_product_by_barcode(barcode):
         'threshold': product.threshold,
         'supplier_id': product.supplier_id,
         'barcode': product.barcode
+    }
+    cache.set(barcode, data, generation)
+    return jsonify(data), 200
+
+@products_bp.route('/cache-stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    return jsonify({
+        'barcode': _barcode_cache().stats(),
+        'listings': current_app.extensions['listing_cache'].stats()
     }), 200
@@ -1,22 +1,54 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.models import Supplier
+from app.models.models import Product, Supplier, TableVersion
 from app import db
+from app.etags import cached_listing, invalidate_listings, listing_etag, not_modified
+from app.serializers import fetch_rows, json_response
+from sqlalchemy import and_, delete, exists, func, select
 
 suppliers_bp = Blueprint('suppliers', __name__)
 
 @suppliers_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_suppliers():
-    suppliers = Supplier.query.all()
-    return jsonify([{
-        'id': s.id,
-        'name': s.name,
-        'contact_name': s.contact_name,
-        'email': s.email,
-        'phone': s.phone,
-        'address': s.address
-    } for s in suppliers]), 200
+    etag = listing_etag('suppliers')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    def build():
+        return json_response(fetch_rows(select(
+            Supplier.id, Supplier.name, Supplier.contact_name,
+            Supplier.email, Supplier.phone, Supplier.address
+        )))
+    
+    return cached_listing('suppliers', etag, build), 200
+
+@suppliers_bp.route('/summary', methods=['GET'])
+@jwt_required()
+def get_supplier_summary():
+    # Depends on products as well, so either table's writes change the ETag
+    etag = listing_etag('suppliers', 'products')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    # One pass over products per supplier via ix_products_supplier_id; the
+    # outer join keeps suppliers without live products at zero
+    summary = fetch_rows(
+        select(
+            Supplier.id, Supplier.name,
+            func.count(Product.id).label('product_count'),
+            func.coalesce(func.sum(Product.quantity), 0).label('total_units'),
+            func.count(Product.id).filter(Product.is_low_stock == True).label('low_stock_count')
+        )
+        .outerjoin(Product, and_(Product.supplier_id == Supplier.id, Product.is_deleted == False))
+        .group_by(Supplier.id, Supplier.name)
+        .order_by(Supplier.id)
+    )
+    response = json_response(summary)
+    response.set_etag(etag)
+    return response, 200
 
 @suppliers_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -32,7 +64,9 @@ def create_supplier():
     )
     
     db.session.add(supplier)
+    TableVersion.bump('suppliers')
     db.session.commit()
+    invalidate_listings('suppliers')
     
     return jsonify({
         'message': 'Supplier created successfully',
@@ -48,8 +82,10 @@ def update_supplier(id):
     for field in ['name', 'contact_name', 'email', 'phone', 'address']:
         if field in data:
             setattr(supplier, field, data[field])
+    TableVersion.bump('suppliers')
     
     db.session.commit()
+    invalidate_listings('suppliers')
     return jsonify({'message': 'Supplier updated successfully'}), 200
 
 @suppliers_bp.route('/<int:id>', methods=['DELETE'])
@@ -57,13 +93,16 @@ def update_supplier(id):
 def delete_supplier(id):
     supplier = Supplier.query.get_or_404(id)
     
-    # Check if supplier has associated products
-    if supplier.products:
+    # Check if supplier has associated products (without loading them)
+    if db.session.execute(select(exists().where(Product.supplier_id == id))).scalar():
         return jsonify({
             'error': 'Cannot delete supplier with associated products'
         }), 400
     
-    db.session.delete(supplier)
+    # Core DELETE: the ORM would load supplier.products again to unlink them
+    db.session.execute(delete(Supplier).where(Supplier.id == id))
+    TableVersion.bump('suppliers')
     db.session.commit()
+    invalidate_listings('suppliers')
     
     return jsonify({'message': 'Supplier deleted successfully'}), 200
@@ -1,94 +1,369 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, abort, current_app, request, jsonify, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.models.models import StockTransaction, Product
+from app.models.models import StockMovementRollup, StockTransaction, Product, TableVersion
 from app import db
+from app.archive import transactions_since
+from app.events import publish_stock_change
+from app.etags import cached_listing, invalidate_listings, listing_etag, not_modified
+from app.rollups import PERIODS, add_to_rollups
+from app.serializers import fetch_rows, isoformat, json_response
+from app.snapshots import quantity_as_of
+from app.stock import InsufficientStock, ProductNotFound, record_movement
+from app.write_queue import WriterBusy
+from datetime import datetime, time
+from sqlalchemy import bindparam, insert, select
+import csv
+import io
+import tempfile
 
 transactions_bp = Blueprint('transactions', __name__)
 
+MAX_BATCH_LINES = 1000
+EXPORT_BATCH_SIZE = 5000
+EXPORT_COLUMNS = ['id', 'product_id', 'user_id', 'type', 'quantity', 'date', 'notes']
+
 @transactions_bp.route('/', methods=['POST'])
 @jwt_required()
 def create_transaction():
     data = request.get_json()
     current_user = get_jwt_identity()
+    data = data if isinstance(data, dict) else {}
+    product_id, quantity = data.get('product_id'), data.get('quantity')
     
-    product = Product.query.get_or_404(data['product_id'])
-    
-    # Validate transaction
-    if data['type'] not in ['in', 'out']:
+    # Validate transaction (same rules as a batch line; True == 1, so bools
+    # are not ids even though they are ints)
+    if not isinstance(product_id, int) or isinstance(product_id, bool):
+        return jsonify({'error': 'product_id must be an integer'}), 400
+    if data.get('type') not in ['in', 'out']:
         return jsonify({'error': 'Invalid transaction type'}), 400
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        return jsonify({'error': 'Quantity must be a positive integer'}), 400
     
-    if data['type'] == 'out' and product.quantity < data['quantity']:
-        return jsonify({'error': 'Insufficient stock'}), 400
-    
-    # Create transaction
-    transaction = StockTransaction(
-        product_id=data['product_id'],
-        user_id=current_user['user_id'],
-        type=data['type'],
-        quantity=data['quantity'],
-        notes=data.get('notes')
+    movement = (
+        product_id,
+        data['type'],
+        quantity,
+        current_user['user_id'],
+        data.get('notes')
     )
+    writer = current_app.extensions.get('stock_writer')
     
-    # Update product quantity
-    if data['type'] == 'in':
-        product.quantity += data['quantity']
-    else:
-        product.quantity -= data['quantity']
+    # Stock check and quantity change happen in one conditional UPDATE
+    try:
+        if writer is not None:
+            # Committed together with other requests' movements
+            product = writer.record(*movement)
+        else:
+            product = record_movement(*movement)
+            db.session.commit()
+    except ProductNotFound:
+        db.session.rollback()
+        abort(404)
+    except InsufficientStock:
+        db.session.rollback()
+        return jsonify({'error': 'Insufficient stock'}), 400
+    except WriterBusy:
+        return jsonify({'error': 'Too many stock writes queued, please retry'}), 503
     
-    db.session.add(transaction)
-    db.session.commit()
+    invalidate_listings('products')
+    current_app.extensions['barcode_cache'].invalidate(product.barcode)
+    delta = data['quantity'] if data['type'] == 'in' else -data['quantity']
+    publish_stock_change(
+        data['product_id'], product.quantity, product.threshold, product.is_low_stock,
+        was_low_stock=Product.is_low(product.quantity - delta, product.threshold, product.is_deleted)
+    )
     
     return jsonify({
         'message': 'Transaction created successfully',
         'new_quantity': product.quantity
     }), 201
 
-@transactions_bp.route('/', methods=['GET'])
+@transactions_bp.route('/batch', methods=['POST'])
 @jwt_required()
-def get_transactions():
-    # Support filtering by date range and transaction type
+def create_transaction_batch():
+    data = request.get_json()
+    current_user = get_jwt_identity()
+    lines = data.get('transactions') if isinstance(data, dict) else None
+    
+    if not isinstance(lines, list) or not lines:
+        return jsonify({'error': 'transactions must be a non-empty list'}), 400
+    if len(lines) > MAX_BATCH_LINES:
+        return jsonify({'error': f'A batch may contain at most {MAX_BATCH_LINES} lines'}), 400
+    
+    # Load every referenced product in one query (True == 1, so bools are
+    # not ids even though they are ints)
+    product_ids = {line.get('product_id') for line in lines
+                   if isinstance(line, dict) and isinstance(line.get('product_id'), int)
+                   and not isinstance(line.get('product_id'), bool)}
+    stock = dict(db.session.execute(
+        select(Product.id, Product.quantity).where(Product.id.in_(product_ids))
+    ).all())
+    
+    # Validate lines in order against a running quantity per product
+    results = []
+    for index, line in enumerate(lines):
+        line = line if isinstance(line, dict) else {}
+        product_id, quantity = line.get('product_id'), line.get('quantity')
+        result = {'index': index, 'product_id': product_id}
+        
+        if (not isinstance(product_id, int) or isinstance(product_id, bool)
+                or product_id not in stock):
+            result['error'] = 'Product not found'
+        elif line.get('type') not in ['in', 'out']:
+            result['error'] = 'Invalid transaction type'
+        elif not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            result['error'] = 'Quantity must be a positive integer'
+        elif line['type'] == 'out' and (stock[product_id] or 0) < quantity:
+            result['error'] = 'Insufficient stock'
+        else:
+            delta = quantity if line['type'] == 'in' else -quantity
+            stock[product_id] = (stock[product_id] or 0) + delta
+            result['new_quantity'] = stock[product_id]
+        
+        result['status'] = 'error' if 'error' in result else 'ok'
+        results.append(result)
+    
+    # All or nothing: one bad line rejects the whole batch
+    if any(r['status'] == 'error' for r in results):
+        return jsonify({'error': 'Batch rejected', 'results': results}), 400
+    
+    # Net quantity change per product, applied with one executemany UPDATE.
+    # The deltas are relative, so movements committed elsewhere since the read
+    # above are kept; the guard only refuses a row whose quantity would end up
+    # below zero, and such a row makes the row count come up short.
+    deltas = {}
+    for line in lines:
+        delta = line['quantity'] if line['type'] == 'in' else -line['quantity']
+        deltas[line['product_id']] = deltas.get(line['product_id'], 0) + delta
+    
+    products = Product.__table__
+    TableVersion.bump('products')
+    updated = db.session.execute(
+        products.update()
+        .where(products.c.id == bindparam('pid'))
+        .where(db.func.coalesce(products.c.quantity, 0) + bindparam('delta') >= 0)
+        .values(quantity=db.func.coalesce(products.c.quantity, 0) + bindparam('delta')),
+        [{'pid': pid, 'delta': delta} for pid, delta in deltas.items()]
+    ).rowcount
+    if updated != len(deltas):
+        db.session.rollback()
+        return jsonify({'error': 'Stock changed while the batch was applied, please retry'}), 409
+    
+    # The quantities the UPDATE actually left, read in the same transaction:
+    # they include movements committed elsewhere since the validation read,
+    # while is_low_stock is still each product's flag from before this batch
+    current = {row.id: row for row in db.session.execute(
+        select(Product.id, Product.quantity, Product.barcode, Product.threshold,
+               Product.is_deleted, Product.is_low_stock).where(Product.id.in_(list(deltas)))
+    )}
+    # Replay the lines from each product's quantity before the batch
+    running = {pid: (current[pid].quantity or 0) - delta for pid, delta in deltas.items()}
+    for line, result in zip(lines, results):
+        delta = line['quantity'] if line['type'] == 'in' else -line['quantity']
+        running[line['product_id']] += delta
+        result['new_quantity'] = running[line['product_id']]
+    
+    db.session.execute(
+        products.update()
+        .where(products.c.id.in_(list(deltas)))
+        .values(is_low_stock=Product.low_stock_expression())
+    )
+    date = datetime.utcnow()
+    db.session.execute(insert(StockTransaction), [{
+        'product_id': line['product_id'],
+        'user_id': current_user['user_id'],
+        'type': line['type'],
+        'quantity': line['quantity'],
+        'date': date,
+        'notes': line.get('notes')
+    } for line in lines])
+    add_to_rollups((line['product_id'], line['type'], line['quantity'], date)
+                   for line in lines)
+    db.session.commit()
+    invalidate_listings('products')
+    current_app.extensions['barcode_cache'].invalidate(*(row.barcode for row in current.values()))
+    for row in current.values():
+        publish_stock_change(
+            row.id, row.quantity, row.threshold,
+            Product.is_low(row.quantity, row.threshold, row.is_deleted),
+            was_low_stock=row.is_low_stock, quantity_changed=deltas[row.id] != 0
+        )
+    
+    return jsonify({
+        'message': f'{len(lines)} transactions created successfully',
+        'results': results
+    }), 201
+
+def _transaction_query():
+    # Support filtering by date range and transaction type. Ranges that reach
+    # back past the archive horizon (or have no start) read archived rows too.
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     trans_type = request.args.get('type')
     product_id = request.args.get('product_id')
     
-    query = StockTransaction.query
+    try:
+        start = datetime.fromisoformat(start_date) if start_date else None
+    except ValueError:
+        start = None
+    source = transactions_since(start)
     
+    statement = select(*[source.c[name] for name in EXPORT_COLUMNS])
     if start_date:
-        query = query.filter(StockTransaction.date >= start_date)
+        statement = statement.where(source.c.date >= start_date)
     if end_date:
-        query = query.filter(StockTransaction.date <= end_date)
+        statement = statement.where(source.c.date <= end_date)
     if trans_type:
-        query = query.filter_by(type=trans_type)
+        statement = statement.where(source.c.type == trans_type)
     if product_id:
-        query = query.filter_by(product_id=product_id)
+        statement = statement.where(source.c.product_id == product_id)
+    return statement, source
+
+@transactions_bp.route('/', methods=['GET'])
+@jwt_required()
+def get_transactions():
+    statement, _ = _transaction_query()
+    transactions = fetch_rows(statement, converters={'date': isoformat})
     
-    transactions = query.all()
+    return json_response(transactions), 200
+
+def _export_rows():
+    # Server-side cursor over the filtered transactions, EXPORT_BATCH_SIZE rows at a time
+    statement, source = _transaction_query()
+    result = db.session.execute(
+        statement.order_by(source.c.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    return result.partitions()
+
+def _export_csv():
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in _export_rows():
+            for row in rows:
+                writer.writerow([value.isoformat() if isinstance(value, datetime) else value
+                                 for value in row])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
     
-    return jsonify([{
-        'id': t.id,
-        'product_id': t.product_id,
-        'user_id': t.user_id,
-        'type': t.type,
-        'quantity': t.quantity,
-        'date': t.date.isoformat(),
-        'notes': t.notes
-    } for t in transactions]), 200
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=transactions.csv'
+    return response
+
+def _export_parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return jsonify({'error': 'Parquet export requires pyarrow to be installed'}), 501
+    
+    # Parquet needs its footer written last, so row groups go to a temporary
+    # file one batch at a time and the finished file is sent from disk
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('product_id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('type', pa.string()),
+        ('quantity', pa.int64()),
+        ('date', pa.timestamp('us')),
+        ('notes', pa.string())
+    ])
+    output = tempfile.TemporaryFile()
+    with pq.ParquetWriter(output, schema) as writer:
+        for rows in _export_rows():
+            writer.write_table(pa.Table.from_pylist([row._asdict() for row in rows], schema=schema))
+    output.seek(0)
+    
+    return send_file(output, mimetype='application/vnd.apache.parquet',
+                     as_attachment=True, download_name='transactions.parquet')
+
+@transactions_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_transactions():
+    # Same filters as GET /api/transactions/, streamed instead of materialized
+    export_format = request.args.get('format', 'csv')
+    if export_format == 'csv':
+        return _export_csv()
+    if export_format == 'parquet':
+        return _export_parquet()
+    return jsonify({'error': 'format must be csv or parquet'}), 400
 
 
 @transactions_bp.route('/low-stock', methods=['GET'])
 @jwt_required()
 def get_low_stock_products():
-    # Get products where quantity is below threshold
-    products = Product.query.filter(
-        Product.quantity <= Product.threshold,
-        Product.is_deleted == False
-    ).all()
+    # Low-stock flag is maintained on every stock/threshold change, so this
+    # reads only the partial index of flagged products
+    etag = listing_etag('products')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    def build():
+        return json_response(fetch_rows(
+            select(Product.id, Product.name, Product.quantity, Product.threshold,
+                   Product.supplier_id)
+            .where(Product.is_low_stock == True)
+        ))
+    
+    return cached_listing('products', etag, build), 200
+
+@transactions_bp.route('/stock-as-of', methods=['GET'])
+@jwt_required()
+def get_stock_as_of():
+    # Stock of one product at a past instant; a bare date means close of that day
+    product = Product.query.get_or_404(request.args.get('product_id', type=int))
+    value = request.args.get('date', '')
+    try:
+        at = datetime.fromisoformat(value)
+    except ValueError:
+        return jsonify({'error': 'date must be an ISO date or datetime'}), 400
+    if len(value) == 10:
+        at = datetime.combine(at.date(), time.max)
+    
+    quantity, source = quantity_as_of(product, at)
+    
+    return jsonify({
+        'product_id': product.id,
+        'date': at.isoformat(),
+        'quantity': quantity,
+        'source': source
+    }), 200
+
+@transactions_bp.route('/movement', methods=['GET'])
+@jwt_required()
+def get_stock_movement():
+    # Units in/out per day or week, served from the rollup tables; without
+    # product_id the totals cover all products
+    period = request.args.get('period', 'day')
+    if period not in PERIODS:
+        return jsonify({'error': f"period must be one of: {', '.join(PERIODS)}"}), 400
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.fromisoformat(start_date).date() if start_date else None
+        end_date = datetime.fromisoformat(end_date).date() if end_date else None
+    except ValueError:
+        return jsonify({'error': 'start_date and end_date must be ISO dates'}), 400
+    try:
+        product_id = int(request.args.get('product_id', 0))
+    except ValueError:
+        return jsonify({'error': 'product_id must be an integer'}), 400
+    
+    query = StockMovementRollup.query.filter_by(period=period, product_id=product_id)
+    if start_date:
+        query = query.filter(StockMovementRollup.period_start >= start_date)
+    if end_date:
+        query = query.filter(StockMovementRollup.period_start <= end_date)
+    
+    rollups = query.order_by(StockMovementRollup.period_start, StockMovementRollup.type).all()
     
     return jsonify([{
-        'id': p.id,
-        'name': p.name,
-        'quantity': p.quantity,
-        'threshold': p.threshold,
-        'supplier_id': p.supplier_id
-    } for p in products]), 200
+        'period_start': r.period_start.isoformat(),
+        'type': r.type,
+        'quantity': r.quantity,
+        'count': r.count
+    } for r in rollups]), 200
@@ -0,0 +1,57 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from app import db
+
+# Statements that populate a column the first time it is added to an existing table
+BACKFILLS = {
+    ('products', 'is_low_stock'): (
+        # CASE, not the bare comparison: a NULL quantity or threshold must
+        # give 0 (as Product.is_low does), not NULL in a NOT NULL column
+        'UPDATE products SET is_low_stock = CASE WHEN '
+        'COALESCE(is_deleted, 0) = 0 AND quantity <= threshold THEN 1 ELSE 0 END'
+    ),
+    ('products', 'updated_at'): 'UPDATE products SET updated_at = created_at',
+}
+
+# Indexes from earlier releases that have since been replaced
+OBSOLETE_INDEXES = {
+    'products': ['ix_products_low_stock'],
+}
+
+def upgrade_schema():
+    """Bring an existing database up to date with the models.
+
+    db.create_all() only creates tables that are missing, so databases created
+    by an older release never receive new columns or indexes. This adds any
+    column or index that is declared on a model but not present in the
+    database, backfilling derived columns as they are added. Safe to run on
+    every start-up.
+    """
+    changes = []
+
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+                if (table.name, column.name) in BACKFILLS:
+                    conn.execute(text(BACKFILLS[(table.name, column.name)]))
+                changes.append(f'{table.name}.{column.name}')
+
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for name in OBSOLETE_INDEXES.get(table.name, []):
+                if name in existing:
+                    conn.execute(text(f'DROP INDEX {name}'))
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    changes.append(index.name)
+
+    return changes
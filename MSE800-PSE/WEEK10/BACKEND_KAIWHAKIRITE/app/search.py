@@ -0,0 +1,74 @@
+import re
+from sqlalchemy import select, text
+from app import db
+
+# External-content FTS5 index over the searchable product columns. The
+# products table stays the source of truth; triggers mirror every insert,
+# delete and change to an indexed column. Quantity updates do not touch it.
+FTS_COLUMNS = ['name', 'description', 'category', 'barcode']
+
+_new_values = ', '.join(f'new.{column}' for column in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{column}' for column in FTS_COLUMNS)
+_columns = ', '.join(FTS_COLUMNS)
+
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE products_fts USING fts5(
+        {_columns}, content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, {_columns})
+        VALUES ('delete', old.id, {_old_values});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF {_columns} ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, {_columns})
+        VALUES ('delete', old.id, {_old_values});
+        INSERT INTO products_fts(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END""",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+# bm25 column weights, in FTS_COLUMNS order: a name hit beats a description hit
+RANK = 'bm25(products_fts, 10.0, 1.0, 4.0, 8.0)'
+
+def ensure_product_search():
+    """Create the FTS5 index and its triggers if missing; False if unsupported.
+
+    Only SQLite builds with FTS5 (the default for Python's bundled SQLite)
+    can host the index. Existing products are indexed when it is created.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    with db.engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        )).first()
+        if exists:
+            return True
+        try:
+            for statement in SEARCH_DDL:
+                conn.execute(text(statement))
+        except Exception as e:
+            if 'fts5' not in str(e):
+                raise
+            return False
+    return True
+
+def match_expression(q):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'\w+', q)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def ranked_hits(match, candidates):
+    """Subquery of the `candidates` best (rowid AS id, score) matches, best first."""
+    return (
+        select(db.column('rowid').label('id'), db.literal_column(RANK).label('score'))
+        .select_from(db.table('products_fts'))
+        .where(db.literal_column('products_fts').op('MATCH')(match))
+        .order_by(db.literal_column('score'))
+        .limit(candidates)
+        .subquery()
+    )
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+import random
+from flask import current_app
+from sqlalchemy import bindparam, func, select
+from app import db
+from app.models.models import Product, StockTransaction, Supplier, TableVersion, User
+from app.rollups import rebuild_rollups
+
+BATCH_SIZE = 10000
+SEED_PASSWORD = 'seed-password'
+CATEGORIES = ['Kai', 'Dairy', 'Bakery', 'Produce', 'Pantry', 'Beverages', 'Household', 'Crafts']
+UNITS = ['each', 'kg', 'L', 'pack', 'box']
+WORDS = ['kumara', 'harakeke', 'kawakawa', 'manuka', 'honey', 'rewena', 'bread', 'kina',
+         'paua', 'tea', 'flax', 'kete', 'butter', 'milk', 'flour', 'oil', 'rice', 'salt']
+
+def _execute_batches(statement, rows):
+    # executemany in BATCH_SIZE chunks so memory stays flat for any volume
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(statement, batch)
+            batch = []
+    if batch:
+        db.session.execute(statement, batch)
+
+def _insert(table, rows):
+    """Bulk insert dict rows, straight through the DB-API driver where possible.
+
+    Per-row parameter handling in SQLAlchemy costs about as much as SQLite's
+    own insert, so for positional drivers (sqlite3) rows are converted to
+    tuples once, using the columns' own bind processors, and handed to the
+    cursor's executemany.
+    """
+    dialect = db.engine.dialect
+    if not dialect.positional:
+        _execute_batches(table.insert(), rows)
+        return
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return
+    names = list(first)
+    sql = str(table.insert().compile(dialect=dialect, column_keys=names))
+    processors = [table.c[name].type.bind_processor(dialect) for name in names]
+    converters = [(index, processor) for index, processor in enumerate(processors) if processor]
+    connection = db.session.connection()
+
+    def to_tuple(row):
+        values = [row[name] for name in names]
+        for index, processor in converters:
+            values[index] = processor(values[index])
+        return tuple(values)
+
+    batch = [to_tuple(first)]
+    for row in rows:
+        batch.append(to_tuple(row))
+        if len(batch) == BATCH_SIZE:
+            connection.exec_driver_sql(sql, batch)
+            batch = []
+    if batch:
+        connection.exec_driver_sql(sql, batch)
+
+def _new_ids(model, after):
+    return db.session.execute(
+        select(model.id).where(model.id > after).order_by(model.id)
+    ).scalars().all()
+
+def seed_database(users=10, suppliers=50, products=1000, transactions=10000, days=730,
+                  seed=1, progress=None):
+    """Fill the database with synthetic, internally consistent inventory data.
+
+    Rows are generated lazily and written with batched executemany inserts
+    in one transaction; existing rows are kept. Movements are spread over
+    the last `days` days in date order and skewed so a few products are hot.
+    Each product's quantity is its net movement, and the low-stock flag and
+    rollups are rebuilt to match. Seeded users log in with SEED_PASSWORD.
+    Returns the number of rows added per table.
+    """
+    rng = random.Random(seed)
+    report = progress or (lambda message: None)
+    now = datetime.utcnow()
+    start = now - timedelta(days=days)
+    last = {model: db.session.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+            for model in (User, Supplier, Product)}
+
+    # One real hash shared by every seeded user; hashing each would dominate
+    password_hash = current_app.extensions['password_hasher'].hash(SEED_PASSWORD)
+    _insert(User.__table__, ({
+        'username': f'seed-user-{last[User] + n + 1}',
+        'password_hash': password_hash,
+        'role': 'kaimahi',
+        'created_at': start
+    } for n in range(users)))
+    user_ids = _new_ids(User, last[User])
+    report(f'{len(user_ids)} users')
+
+    _insert(Supplier.__table__, ({
+        'name': f'{rng.choice(WORDS).title()} Supplies {last[Supplier] + n}',
+        'contact_name': f'Contact {n}',
+        'email': f'supplier{last[Supplier] + n}@example.com',
+        'phone': f'09 {rng.randrange(1000000, 9999999)}',
+        'created_at': start
+    } for n in range(suppliers)))
+    supplier_ids = _new_ids(Supplier, last[Supplier])
+    report(f'{len(supplier_ids)} suppliers')
+
+    _insert(Product.__table__, ({
+        'name': f'{rng.choice(WORDS).title()} {rng.choice(WORDS)} {last[Product] + n}',
+        'description': ' '.join(rng.choice(WORDS) for _ in range(8)),
+        'quantity': 0,
+        'category': rng.choice(CATEGORIES),
+        'unit': rng.choice(UNITS),
+        'threshold': rng.choice([5, 10, 20, 50]),
+        'supplier_id': rng.choice(supplier_ids) if supplier_ids else None,
+        'barcode': f'94{last[Product] + n:011d}',
+        'created_at': start,
+        'updated_at': start,
+        'row_version': 0,  # stamped by the quantity update below
+        'is_deleted': False,
+        'is_low_stock': False
+    } for n in range(products)))
+    product_ids = _new_ids(Product, last[Product])
+    report(f'{len(product_ids)} products')
+
+    net = dict.fromkeys(product_ids, 0)
+    span = (now - start).total_seconds()
+
+    def movements():
+        for n in range(transactions if product_ids else 0):
+            # random() ** 3 skews picks toward the front of the list: hot products
+            product_id = product_ids[int(len(product_ids) * rng.random() ** 3)]
+            if rng.random() < 0.3:
+                type, quantity = 'in', rng.randint(10, 100)
+            else:
+                type, quantity = 'out', rng.randint(1, 10)
+            net[product_id] += quantity if type == 'in' else -quantity
+            if n and n % 1000000 == 0:
+                report(f'{n} transactions')
+            yield {
+                'product_id': product_id,
+                'user_id': rng.choice(user_ids) if user_ids else None,
+                'type': type,
+                'quantity': quantity,
+                'date': start + timedelta(seconds=span * n / transactions + rng.random()),
+                'notes': None
+            }
+    # Building the secondary indexes once at the end beats updating them per row
+    connection = db.session.connection()
+    for index in StockTransaction.__table__.indexes:
+        index.drop(connection, checkfirst=True)
+    _insert(StockTransaction.__table__, movements())
+
+    # Products that went negative get one restocking movement at the end
+    adjustments = [{
+        'product_id': product_id, 'user_id': user_ids[0] if user_ids else None,
+        'type': 'in', 'quantity': -quantity, 'date': now, 'notes': 'Seed adjustment'
+    } for product_id, quantity in net.items() if quantity < 0]
+    _insert(StockTransaction.__table__, adjustments)
+    for index in StockTransaction.__table__.indexes:
+        index.create(connection)
+    report(f'{transactions + len(adjustments)} transactions')
+
+    TableVersion.bump('products')
+    products_table = Product.__table__
+    update = products_table.update().where(products_table.c.id == bindparam('pid')).values(
+        quantity=bindparam('new_quantity'))
+    _execute_batches(update, ({'pid': product_id, 'new_quantity': max(quantity, 0)}
+                              for product_id, quantity in net.items()))
+    db.session.execute(products_table.update().where(products_table.c.id > last[Product])
+                       .values(is_low_stock=Product.low_stock_expression()))
+    TableVersion.bump('suppliers')
+    db.session.commit()
+
+    rebuild_rollups()
+    report('rollups rebuilt')
+    return {'users': len(user_ids), 'suppliers': len(supplier_ids),
+            'products': len(product_ids), 'stock_transactions': transactions + len(adjustments)}
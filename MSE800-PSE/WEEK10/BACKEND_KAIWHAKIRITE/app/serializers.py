@@ -0,0 +1,53 @@
+from datetime import datetime
+from flask import current_app, jsonify
+from app import db
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to Flask's own encoder
+    orjson = None
+
+def fetch_rows(statement, converters=None):
+    """Execute a column-projected select and return plain dicts.
+
+    Selecting columns instead of entities skips ORM object hydration and
+    identity-map bookkeeping entirely; converters maps a column name to a
+    function applied to non-null values (e.g. datetime -> isoformat).
+    """
+    rows = [dict(row) for row in db.session.execute(statement).mappings()]
+    for name, convert in (converters or {}).items():
+        for row in rows:
+            if row[name] is not None:
+                row[name] = convert(row[name])
+    return rows
+
+def isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _is_flask_default(provider):
+    compact = provider.compact if provider.compact is not None else not current_app.debug
+    return compact and provider.sort_keys and provider.ensure_ascii
+
+def json_response(payload):
+    """Drop-in for jsonify(payload) that encodes with orjson when available.
+
+    The bytes are identical to jsonify's compact output (keys sorted, no
+    whitespace, trailing newline) except for floats that Python writes in
+    exponent notation: orjson gives 1e16 and 0.00001 where jsonify gives
+    1e+16 and 1e-05, the same numbers once parsed. NaN and infinities become
+    null instead of jsonify's invalid NaN/Infinity, so callers should map
+    them to None themselves. Checking every payload for such floats would
+    cost as much as the encoding saves, so it is not done. orjson cannot
+    escape non-ASCII text the way ensure_ascii does, so any payload whose
+    output is not pure ASCII (or that orjson rejects) is encoded by jsonify
+    instead.
+    """
+    provider = current_app.json
+    if orjson is not None and _is_flask_default(provider):
+        try:
+            body = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except (TypeError, orjson.JSONEncodeError):
+            body = None
+        if body is not None and body.isascii():
+            return current_app.response_class(body, mimetype=provider.mimetype)
+    return jsonify(payload)
@@ -0,0 +1,65 @@
+from datetime import datetime
+from sqlalchemy import case, func, insert, select
+from app import db
+from app.archive import transactions_since
+from app.models.models import Product, StockSnapshot, TableVersion
+
+def take_stock_snapshot():
+    """Record the current quantity of every product; returns (taken_at, rows).
+
+    Run once per period (e.g. nightly from cron via `flask snapshot-stock`).
+    The snapshot table's version row is bumped first so the write lock is
+    held before the clock is read: every movement dated before taken_at is
+    already in the quantities, and every later one is dated after it.
+    """
+    TableVersion.bump('stock_snapshots')
+    taken_at = datetime.utcnow()
+    rows = db.session.execute(
+        insert(StockSnapshot).from_select(
+            ['product_id', 'taken_at', 'quantity'],
+            select(Product.id, db.literal(taken_at, db.DateTime),
+                   func.coalesce(Product.quantity, 0))
+        )
+    ).rowcount
+    db.session.commit()
+    return taken_at, rows
+
+def _net_movement(product_id, after, until):
+    # Signed sum of transactions dated in (after, until]; either bound may be open
+    transactions = transactions_since(after)
+    query = select(func.coalesce(func.sum(case(
+        (transactions.c.type == 'in', transactions.c.quantity),
+        else_=-transactions.c.quantity
+    )), 0)).where(transactions.c.product_id == product_id)
+    if after is not None:
+        query = query.where(transactions.c.date > after)
+    if until is not None:
+        query = query.where(transactions.c.date <= until)
+    return db.session.execute(query).scalar()
+
+def quantity_as_of(product, at):
+    """Quantity of product at instant at, replaying only a short tail of history.
+
+    Starts from whichever snapshot is closest to at (before or after it) and
+    applies the transactions in between, forwards or backwards. Without any
+    snapshot it works back from the live quantity. Returns (quantity, source).
+    """
+    if product.created_at and at < product.created_at:
+        return 0, 'before_created'
+
+    before = db.session.execute(
+        select(StockSnapshot.taken_at, StockSnapshot.quantity)
+        .where(StockSnapshot.product_id == product.id, StockSnapshot.taken_at <= at)
+        .order_by(StockSnapshot.taken_at.desc()).limit(1)
+    ).first()
+    after = db.session.execute(
+        select(StockSnapshot.taken_at, StockSnapshot.quantity)
+        .where(StockSnapshot.product_id == product.id, StockSnapshot.taken_at > at)
+        .order_by(StockSnapshot.taken_at).limit(1)
+    ).first()
+
+    if before and (not after or at - before.taken_at <= after.taken_at - at):
+        return before.quantity + _net_movement(product.id, before.taken_at, at), 'snapshot'
+    if after:
+        return after.quantity - _net_movement(product.id, at, after.taken_at), 'snapshot'
+    return (product.quantity or 0) - _net_movement(product.id, at, None), 'live'
@@ -0,0 +1,69 @@
+from datetime import datetime
+from sqlalchemy import insert, select
+from app import db
+from app.models.models import Product, StockTransaction, TableVersion
+from app.rollups import add_to_rollups
+
+class ProductNotFound(Exception):
+    pass
+
+class InsufficientStock(Exception):
+    pass
+
+def apply_movement(product_id, type, quantity):
+    """Change a product's quantity for one stock movement.
+
+    The quantity change is a single conditional UPDATE, so concurrent workers
+    can never oversell or lose each other's updates: a stock-out only matches
+    the row while enough stock is left, and a zero row count means it was
+    refused (nothing is written then). Returns the product's new quantity,
+    barcode, threshold and alert state; log_movements() records the movement.
+    """
+    products = Product.__table__
+    delta = quantity if type == 'in' else -quantity
+    new_quantity = db.func.coalesce(products.c.quantity, 0) + delta
+
+    statement = products.update().where(products.c.id == product_id)
+    if type == 'out':
+        statement = statement.where(products.c.quantity >= quantity)
+    statement = statement.values(
+        quantity=new_quantity,
+        is_low_stock=Product.low_stock_expression(new_quantity)
+    )
+
+    if db.session.execute(statement).rowcount == 0:
+        exists = db.session.execute(
+            select(Product.id).where(Product.id == product_id)
+        ).first()
+        raise InsufficientStock() if exists else ProductNotFound()
+
+    return db.session.execute(
+        select(Product.quantity, Product.barcode, Product.threshold, Product.is_deleted,
+               Product.is_low_stock).where(Product.id == product_id)
+    ).first()
+
+def log_movements(movements):
+    """Stage the StockTransaction rows and rollups of applied movements.
+
+    movements are (product_id, type, quantity, user_id, notes) tuples; any
+    number of them cost one INSERT and one rollup upsert. The caller has
+    already bumped the products version (before apply_movement).
+    """
+    date = datetime.utcnow()
+    db.session.execute(insert(StockTransaction), [{
+        'product_id': product_id,
+        'user_id': user_id,
+        'type': type,
+        'quantity': quantity,
+        'date': date,
+        'notes': notes
+    } for product_id, type, quantity, user_id, notes in movements])
+    add_to_rollups((product_id, type, quantity, date)
+                   for product_id, type, quantity, _, _ in movements)
+
+def record_movement(product_id, type, quantity, user_id, notes=None):
+    """Apply one stock movement and stage its StockTransaction row; the caller commits."""
+    TableVersion.bump('products')
+    product = apply_movement(product_id, type, quantity)
+    log_movements([(product_id, type, quantity, user_id, notes)])
+    return product
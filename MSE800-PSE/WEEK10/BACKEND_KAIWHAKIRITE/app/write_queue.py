@@ -0,0 +1,139 @@
+from concurrent.futures import Future
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+import time
+from app import db
+from app.models.models import TableVersion
+from app.stock import InsufficientStock, ProductNotFound, apply_movement, log_movements
+
+class WriterBusy(Exception):
+    pass
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """Applies stock movements from many requests on one writer thread.
+
+    On SQLite every commit waits for an fsync and writers are serialized
+    anyway, so committing per request caps throughput at the disk's sync
+    rate no matter how many workers there are. Here request threads queue
+    their movement and wait; the writer takes everything queued (up to
+    `max_batch`, waiting at most `max_wait` seconds for more once it has
+    one), applies each quantity change in order, records all of them with one
+    INSERT and rollup upsert and commits them together, then completes every
+    request's future. A request therefore only returns once its movement is
+    durable. At most `queue_limit` movements may wait; beyond that record()
+    raises WriterBusy so the caller can shed load.
+
+    Only usable within one process: each worker process has its own writer,
+    and SQLite still serializes the writers of different processes.
+    """
+
+    def __init__(self, app, max_batch=256, max_wait=0.0, queue_limit=10000):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = Queue(maxsize=queue_limit)
+        self._thread = None
+        self._start_lock = Lock()
+        self.batches = 0
+        self.movements = 0
+        self.largest_batch = 0
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='stock-writer', daemon=True)
+                self._thread.start()
+
+    def record(self, product_id, type, quantity, user_id, notes=None):
+        """Queue a movement and wait until it is committed; returns like record_movement."""
+        if self._thread is None:
+            self._start()
+        future = Future()
+        try:
+            self._queue.put_nowait(((product_id, type, quantity, user_id, notes), future))
+        except Full:
+            raise WriterBusy()
+        return future.result()
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except Empty:
+                break
+            if item is _STOP:
+                # Finish what was queued before the stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _apply(self, batch):
+        outcomes, applied = [], []
+        try:
+            # Stamps the batch's product rows (Product.row_version)
+            TableVersion.bump('products')
+            for movement, future in batch:
+                try:
+                    outcomes.append((future, apply_movement(*movement[:3]), None))
+                    applied.append(movement)
+                except (ProductNotFound, InsufficientStock) as error:
+                    # Refused by a zero-row UPDATE, so nothing of it was
+                    # written and the rest of the batch can still commit
+                    outcomes.append((future, None, error))
+            if applied:
+                log_movements(applied)
+                db.session.commit()
+            else:
+                db.session.rollback()
+        except Exception as error:
+            db.session.rollback()
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+            else:
+                # Retry one by one so a single bad movement only fails its own request
+                for item in batch:
+                    self._apply([item])
+            return
+
+        self.batches += 1
+        self.movements += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for future, row, error in outcomes:
+            if error is None:
+                future.set_result(row)
+            else:
+                future.set_exception(error)
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                self._apply(batch)
+            db.session.remove()
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'movements': self.movements,
+            'largest_batch': self.largest_batch,
+            'average_batch': round(self.movements / self.batches, 1) if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def shutdown(self):
+        """Commit everything already queued, then stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
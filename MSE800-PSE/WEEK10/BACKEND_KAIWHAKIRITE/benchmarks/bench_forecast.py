@@ -0,0 +1,65 @@
+"""
+Stock-out forecast: vectorized computation over the daily rollups.
+
+Seeds synthetic products and two years of transactions, then times
+GET /api/products/forecast for a short and a full-history window:
+
+    python -m benchmarks.bench_forecast --products 100000 --transactions 3000000
+"""
+
+import argparse
+import json
+import time
+from sqlalchemy import func, select
+from app import db
+from app.models.models import StockMovementRollup
+from app.routes.products import MAX_PAGE_SIZE
+from app.seed import SEED_PASSWORD, seed_database
+from benchmarks.common import auth_headers, benchmark_app
+
+
+def timed(client, headers, repeat, **params):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get('/api/products/forecast', query_string=params, headers=headers)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_json()
+    return round(min(timings) * 1000, 1)
+
+
+def run(products, transactions, repeat):
+    with benchmark_app() as app:
+        with app.app_context():
+            seed_database(users=1, suppliers=50, products=products,
+                          transactions=transactions, days=730)
+            rollup_rows = db.session.execute(
+                select(func.count()).where(StockMovementRollup.period == 'day',
+                                           StockMovementRollup.type == 'out')
+            ).scalar()
+        client = app.test_client()
+        headers = auth_headers(client, username='seed-user-1', password=SEED_PASSWORD)
+        
+        return {
+            'products': products,
+            'transactions': transactions,
+            'daily_outflow_rows': rollup_rows,
+            'forecast_ms': {
+                'days_90': timed(client, headers, repeat, days=90),
+                'days_730': timed(client, headers, repeat, days=730),
+                'days_730_max_limit': timed(client, headers, repeat, days=730, limit=MAX_PAGE_SIZE),
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--transactions', type=int, default=3000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.products, args.transactions, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
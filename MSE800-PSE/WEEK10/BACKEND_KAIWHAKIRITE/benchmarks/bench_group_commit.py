@@ -0,0 +1,79 @@
+"""
+Stock writes: one commit per request vs group commit on a single writer thread.
+
+Writer threads post stock transactions as fast as they can for a fixed time,
+first with STOCK_WRITE_MODE=direct and then with STOCK_WRITE_MODE=group, and
+report writes per second and latency percentiles for each:
+
+    python -m benchmarks.bench_group_commit --seconds 5 --threads 32
+    python -m benchmarks.bench_group_commit --profile production
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+from benchmarks.common import auth_headers, benchmark_app, summarize
+
+
+def run(mode, profile, seconds, threads, products):
+    with benchmark_app(STOCK_WRITE_MODE=mode, DB_PROFILE=profile) as app:
+        client = app.test_client()
+        headers = auth_headers(client)
+        catalog = 'name,barcode,quantity,threshold\n' + ''.join(
+            f'Product {n},B{n},1000000,10\n' for n in range(products))
+        client.post('/api/products/import', headers=headers, content_type='multipart/form-data',
+                    data={'file': (io.BytesIO(catalog.encode()), 'catalog.csv')})
+        
+        latencies, failures = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        
+        def write():
+            worker = app.test_client()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = worker.post('/api/transactions/', headers=headers, json={
+                    'product_id': random.randint(1, products),
+                    'type': random.choice(['in', 'out']),
+                    'quantity': 1
+                })
+                elapsed = time.perf_counter() - started
+                with lock:
+                    (latencies if response.status_code == 201 else failures).append(elapsed)
+        
+        workers = [threading.Thread(target=write) for _ in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        
+        result = {'writes': summarize(latencies, elapsed), 'failures': len(failures)}
+        writer = app.extensions.get('stock_writer')
+        if writer is not None:
+            writer.shutdown()
+            result['batches'] = writer.stats()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--profile', default='default', choices=['default', 'production'])
+    args = parser.parse_args()
+    print(json.dumps({
+        'profile': args.profile,
+        'threads': args.threads,
+        **{mode: run(mode, args.profile, args.seconds, args.threads, args.products)
+           for mode in ['direct', 'group']},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Login latency under a burst of concurrent logins (a shift starting).
+
+While `--concurrency` threads log in, one more thread keeps scanning a barcode
+so the effect on the rest of the API is visible. Compare a small hashing pool
+with one as large as the burst:
+
+    python -m benchmarks.bench_login --hash-workers 2
+    python -m benchmarks.bench_login --hash-workers 50
+"""
+
+import argparse
+import json
+import threading
+import time
+from benchmarks.common import auth_headers, benchmark_app, summarize
+
+
+def run(concurrency, logins_per_thread, hash_workers, method):
+    config = {'PASSWORD_HASH_METHOD': method, 'PASSWORD_HASH_WORKERS': hash_workers,
+              'PASSWORD_HASH_QUEUE': concurrency}
+    with benchmark_app(**config) as app:
+        client = app.test_client()
+        headers = auth_headers(client)
+        client.post('/api/products/', json={'name': 'Kūmara', 'barcode': '9400001'},
+                    headers=headers)
+        for n in range(concurrency):
+            client.post('/api/auth/register', json={'username': f'kaimahi{n}', 'password': 'pw'})
+        
+        login_latencies, scan_latencies = [], []
+        done = threading.Event()
+        
+        def log_in(n):
+            worker = app.test_client()
+            for _ in range(logins_per_thread):
+                started = time.perf_counter()
+                response = worker.post('/api/auth/login', json={
+                    'username': f'kaimahi{n}', 'password': 'pw'
+                })
+                login_latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.get_json()
+        
+        def scan():
+            worker = app.test_client()
+            while not done.is_set():
+                started = time.perf_counter()
+                worker.get('/api/products/barcode/9400001', headers=headers)
+                scan_latencies.append(time.perf_counter() - started)
+        
+        scanner = threading.Thread(target=scan)
+        threads = [threading.Thread(target=log_in, args=(n,)) for n in range(concurrency)]
+        started = time.perf_counter()
+        scanner.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        scanner.join()
+        
+        return {
+            'method': method,
+            'hash_workers': hash_workers,
+            'concurrency': concurrency,
+            'login': summarize(login_latencies, elapsed),
+            'barcode_scan_during_logins': summarize(scan_latencies, elapsed),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--logins-per-thread', type=int, default=2)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--method', default='pbkdf2')
+    args = parser.parse_args()
+    print(json.dumps(run(args.concurrency, args.logins_per_thread, args.hash_workers,
+                         args.method), indent=2))
+
+
+if __name__ == '__main__':
+    main()
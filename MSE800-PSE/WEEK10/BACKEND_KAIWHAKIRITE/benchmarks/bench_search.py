@@ -0,0 +1,116 @@
+"""
+Product search: FTS5 index vs a LIKE scan over the same columns.
+
+Seeds a catalog with a realistic vocabulary, then times GET
+/api/products/search for a mix of queries against the equivalent
+LIKE '%term%' query:
+
+    python -m benchmarks.bench_search --rows 200000
+"""
+
+import argparse
+import json
+import random
+import time
+from sqlalchemy import or_, select
+from app import db
+from app.models.models import Product
+from app.routes.products import PRODUCT_COLUMNS
+from benchmarks.common import auth_headers, benchmark_app, summarize
+
+WORDS = ['apple', 'banana', 'bread', 'butter', 'cheese', 'chocolate', 'coffee', 'cream',
+         'flour', 'honey', 'kumara', 'milk', 'oat', 'rice', 'salt', 'sugar', 'tea', 'yoghurt']
+ADJECTIVES = ['organic', 'dark', 'light', 'fresh', 'smoked', 'salted', 'whole', 'raw']
+CATEGORIES = ['Dairy', 'Bakery', 'Pantry', 'Produce', 'Beverages', 'Confectionery']
+QUERIES = ['choc', 'milk', 'organic hon', 'kumara', 'dark choc', 'pantry salt', '1234', 'yogh']
+SYLLABLES = ['ka', 'ro', 'ti', 'ma', 'nu', 'pe', 'ho', 'wa', 'ri', 'ta', 'ne', 'ku', 'mo', 'za']
+
+
+def vocabulary(rng, size=4000):
+    # Brand-like filler words so descriptions are not all drawn from WORDS
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(rows):
+    rng = random.Random(1)
+    filler = vocabulary(rng)
+    batch = []
+    for n in range(rows):
+        batch.append({
+            'name': f'{rng.choice(ADJECTIVES).title()} {rng.choice(filler)} {rng.choice(WORDS)}',
+            'description': ' '.join([rng.choice(WORDS)] + rng.sample(filler, 5)),
+            'category': rng.choice(CATEGORIES),
+            'barcode': f'94{n:011d}',
+            'quantity': rng.randint(0, 200),
+            'threshold': 10,
+            'is_deleted': n % 50 == 0,
+        })
+        if len(batch) == 5000:
+            db.session.execute(Product.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Product.__table__.insert(), batch)
+    db.session.commit()
+
+
+def like_search(q, limit):
+    # What a search endpoint without the index would have to do
+    clauses = []
+    for word in q.split():
+        pattern = f'%{word}%'
+        clauses.append(or_(Product.name.ilike(pattern), Product.description.ilike(pattern),
+                           Product.category.ilike(pattern), Product.barcode.ilike(pattern)))
+    statement = select(*PRODUCT_COLUMNS).where(Product.is_deleted == False, *clauses)
+    return db.session.execute(statement.order_by(Product.id).limit(limit)).all()
+
+
+def run(rows, repeat, limit):
+    with benchmark_app() as app:
+        client = app.test_client()
+        headers = auth_headers(client)
+        with app.app_context():
+            seed(rows)
+        
+        fts, like = [], []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for q in QUERIES:
+                t0 = time.perf_counter()
+                response = client.get('/api/products/search', query_string={'q': q, 'limit': limit},
+                                      headers=headers)
+                fts.append(time.perf_counter() - t0)
+                assert response.status_code == 200, response.get_json()
+        fts_elapsed = time.perf_counter() - started
+        
+        with app.app_context():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                for q in QUERIES:
+                    t0 = time.perf_counter()
+                    like_search(q, limit)
+                    like.append(time.perf_counter() - t0)
+            like_elapsed = time.perf_counter() - started
+        
+        return {
+            'rows': rows,
+            'limit': limit,
+            'queries': QUERIES,
+            'fts_endpoint': summarize(fts, fts_elapsed),
+            'like_query_only': summarize(like, like_elapsed),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat, args.limit), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Listing serialization: ORM objects + jsonify vs column projection + json_response.
+
+Seeds a catalog, then times both ways of building GET /api/products/ and
+checks that they produce identical bytes:
+
+    python -m benchmarks.bench_serialization --rows 50000
+"""
+
+import argparse
+import io
+import json
+import time
+from flask import jsonify
+from sqlalchemy import select
+from app import db, serializers
+from app.models.models import Product
+from app.routes.products import PRODUCT_COLUMNS
+from benchmarks.common import auth_headers, benchmark_app
+
+
+def orm_listing():
+    products = Product.query.filter_by(is_deleted=False).order_by(Product.id).all()
+    return [{
+        'id': p.id,
+        'name': p.name,
+        'description': p.description,
+        'quantity': p.quantity,
+        'category': p.category,
+        'unit': p.unit,
+        'threshold': p.threshold,
+        'supplier_id': p.supplier_id,
+        'barcode': p.barcode,
+        'is_deleted': p.is_deleted
+    } for p in products]
+
+
+def projected_listing():
+    return serializers.fetch_rows(
+        select(*PRODUCT_COLUMNS).where(Product.is_deleted == False).order_by(Product.id))
+
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, result
+
+
+def run(rows, repeat):
+    with benchmark_app() as app:
+        client = app.test_client()
+        headers = auth_headers(client)
+        catalog = 'name,barcode,quantity,threshold,category,unit,description\n' + ''.join(
+            f'Product {n},B{n},{n % 90},10,category {n % 30},each,Item number {n}\n'
+            for n in range(rows))
+        client.post('/api/products/import', headers=headers, content_type='multipart/form-data',
+                    data={'file': (io.BytesIO(catalog.encode()), 'catalog.csv')})
+        
+        with app.test_request_context():
+            orm_ms, orm_rows = best_of(repeat, orm_listing)
+            projected_ms, projected_rows = best_of(repeat, projected_listing)
+            jsonify_ms, reference = best_of(repeat, lambda: jsonify(orm_rows).get_data())
+            fast_ms, body = best_of(repeat, lambda: serializers.json_response(projected_rows).get_data())
+        
+        return {
+            'rows': rows,
+            'orjson': serializers.orjson is not None,
+            'identical_bytes': body == reference,
+            'payload_bytes': len(body),
+            'load_ms': {'orm_objects': round(orm_ms, 1), 'projected_rows': round(projected_ms, 1)},
+            'encode_ms': {'jsonify': round(jsonify_ms, 1), 'json_response': round(fast_ms, 1)},
+            'total_ms': {'before': round(orm_ms + jsonify_ms, 1),
+                         'after': round(projected_ms + fast_ms, 1)},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Read throughput while writes are in flight, per database profile.
+
+Reader threads page through the catalog while writer threads post stock
+transactions, first with the default SQLite settings and then with
+DB_PROFILE=production (WAL, tuned pragmas, pooling):
+
+    python -m benchmarks.bench_sqlite_profile --seconds 5 --readers 8 --writers 2
+"""
+
+import argparse
+import io
+import json
+import random
+import threading
+import time
+from benchmarks.common import auth_headers, benchmark_app, summarize
+
+
+def run(profile, seconds, readers, writers, products):
+    with benchmark_app(DB_PROFILE=profile) as app:
+        client = app.test_client()
+        headers = auth_headers(client)
+        catalog = 'name,barcode,quantity,threshold\n' + ''.join(
+            f'Product {n},B{n},1000000,10\n' for n in range(products))
+        client.post('/api/products/import', headers=headers, content_type='multipart/form-data',
+                    data={'file': (io.BytesIO(catalog.encode()), 'catalog.csv')})
+        
+        results = {'read': [], 'write': []}
+        failures = {'read': 0, 'write': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        
+        def loop(kind):
+            worker = app.test_client()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if kind == 'read':
+                    response = worker.get(f'/api/products/?limit=200&after={random.randrange(products)}',
+                                          headers=headers)
+                    ok = response.status_code == 200
+                else:
+                    response = worker.post('/api/transactions/', json={
+                        'product_id': random.randrange(1, products + 1), 'type': 'out', 'quantity': 1
+                    }, headers=headers)
+                    ok = response.status_code == 201
+                with lock:
+                    if ok:
+                        results[kind].append(time.perf_counter() - started)
+                    else:
+                        failures[kind] += 1
+        
+        threads = ([threading.Thread(target=loop, args=('read',)) for _ in range(readers)] +
+                   [threading.Thread(target=loop, args=('write',)) for _ in range(writers)])
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        return {
+            'profile': profile,
+            'reads': {**summarize(results['read'], elapsed), 'failed': failures['read']},
+            'writes': {**summarize(results['write'], elapsed), 'failed': failures['write']},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'production'])
+    args = parser.parse_args()
+    print(json.dumps([run(profile, args.seconds, args.readers, args.writers, args.products)
+                      for profile in args.profiles], indent=2))
+
+
+if __name__ == '__main__':
+    main()
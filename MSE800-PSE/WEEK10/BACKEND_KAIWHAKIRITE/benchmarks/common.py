@@ -0,0 +1,59 @@
+"""
+Helpers shared by the benchmark scripts.
+Run benchmarks from the backend directory, e.g. `python -m benchmarks.bench_login`.
+"""
+
+import math
+import os
+import tempfile
+from contextlib import contextmanager
+from app import create_app, db
+
+BENCH_CONFIG = {
+    'SECRET_KEY': 'benchmark-secret-key-with-enough-bytes',
+    'JWT_SECRET_KEY': 'benchmark-secret-key-with-enough-bytes',
+}
+
+
+@contextmanager
+def benchmark_app(**config):
+    """Yield an app backed by a throwaway SQLite file."""
+    directory = tempfile.mkdtemp(prefix='kaiwhakarite-bench-')
+    path = os.path.join(directory, 'bench.db')
+    app = create_app({**BENCH_CONFIG, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', **config})
+    try:
+        yield app
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+def auth_headers(client, username='bench', password='bench-password', role='rangatira'):
+    """Register (if needed) and log in; return the Authorization header."""
+    client.post('/api/auth/register', json={'username': username, 'password': password, 'role': role})
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (in the same unit)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def summarize(latencies, elapsed):
+    """Count, throughput and p50/p95/p99 in milliseconds for a list of seconds."""
+    return {
+        'count': len(latencies),
+        'per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
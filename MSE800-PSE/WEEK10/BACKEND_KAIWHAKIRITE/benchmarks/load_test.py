@@ -0,0 +1,181 @@
+"""
+Mixed-workload load test of the inventory API, reported per endpoint.
+
+Seeds a throwaway database with app.seed (or uses --database), then runs
+worker threads that replay a till-and-back-office mix of barcode scans,
+stock in/out, catalog listings and low-stock polls for a fixed time.
+Prints p50/p95/p99 latency and throughput per endpoint and saves the
+results as JSON so runs can be compared:
+
+    python -m benchmarks.load_test --products 50000 --transactions 500000 --seconds 30
+    python -m benchmarks.load_test --database sqlite:////path/to/seeded.db --output run.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import select
+from app import create_app, db
+from app.models.models import Product
+from app.seed import SEED_PASSWORD, seed_database
+from benchmarks.common import BENCH_CONFIG, auth_headers, benchmark_app, summarize
+
+# operation -> relative weight; roughly a busy shop's day
+DEFAULT_MIX = {'scan': 60, 'stock_out': 15, 'stock_in': 5, 'list': 12, 'low_stock': 8}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'unknown operation {name!r}')
+        mix[name] = int(weight)
+    return mix
+
+
+@contextmanager
+def seeded_app(args):
+    if args.database:
+        app = create_app({**BENCH_CONFIG, 'SQLALCHEMY_DATABASE_URI': args.database,
+                          'DB_PROFILE': args.profile})
+        yield app
+        return
+    with benchmark_app(DB_PROFILE=args.profile) as app:
+        with app.app_context():
+            started = time.perf_counter()
+            seed_database(users=10, suppliers=max(1, args.products // 100),
+                          products=args.products, transactions=args.transactions, seed=args.seed)
+            print(f'Seeded in {time.perf_counter() - started:.1f}s', flush=True)
+        yield app
+
+
+def operations(catalog):
+    """Request builders per operation; each returns (endpoint, method, url, kwargs, ok statuses)."""
+    ids, barcodes = catalog
+    
+    def hot(values):
+        # Same skew as app.seed: a few products get most of the traffic
+        return values[int(len(values) * random.random() ** 3)]
+    
+    return {
+        'scan': lambda: ('GET /api/products/barcode/<barcode>', 'get',
+                         f'/api/products/barcode/{hot(barcodes)}', {}, {200}),
+        'stock_out': lambda: ('POST /api/transactions/ (out)', 'post', '/api/transactions/',
+                              {'json': {'product_id': hot(ids), 'type': 'out',
+                                        'quantity': random.randint(1, 3)}},
+                              {201, 400}),  # 400: not enough stock, a normal outcome
+        'stock_in': lambda: ('POST /api/transactions/ (in)', 'post', '/api/transactions/',
+                             {'json': {'product_id': hot(ids), 'type': 'in',
+                                       'quantity': random.randint(10, 50)}}, {201}),
+        'list': lambda: ('GET /api/products/?limit=100', 'get', '/api/products/',
+                         {'query_string': {'limit': 100, 'after': random.choice(ids)}}, {200}),
+        'low_stock': lambda: ('GET /api/transactions/low-stock', 'get',
+                              '/api/transactions/low-stock', {}, {200}),
+    }
+
+
+def run(args):
+    with seeded_app(args) as app:
+        with app.app_context():
+            rows = db.session.execute(
+                select(Product.id, Product.barcode).where(Product.is_deleted == False)
+                .order_by(Product.id)
+            ).all()
+            db.session.remove()
+        catalog = ([row.id for row in rows], [row.barcode for row in rows])
+        builders = operations(catalog)
+        names = list(args.mix)
+        weights = [args.mix[name] for name in names]
+        
+        client = app.test_client()
+        # Seeded databases have seed-user-1.. (see app.seed); share them between threads
+        logins = {n: auth_headers(client, f'seed-user-{n}', SEED_PASSWORD)
+                  for n in range(1, min(args.threads, 10) + 1)}
+        users = [logins[n % len(logins) + 1] for n in range(args.threads)]
+        
+        latencies, failures = {}, {}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        
+        def worker(headers):
+            worker_client = app.test_client()
+            local = {}
+            while time.perf_counter() < deadline:
+                endpoint, method, url, kwargs, ok = builders[random.choices(names, weights)[0]]()
+                started = time.perf_counter()
+                response = getattr(worker_client, method)(url, headers=headers, **kwargs)
+                response.get_data()
+                elapsed = time.perf_counter() - started
+                local.setdefault(endpoint, ([], [0]))
+                if response.status_code in ok:
+                    local[endpoint][0].append(elapsed)
+                else:
+                    local[endpoint][1][0] += 1
+            with lock:
+                for endpoint, (values, failed) in local.items():
+                    latencies.setdefault(endpoint, []).extend(values)
+                    failures[endpoint] = failures.get(endpoint, 0) + failed[0]
+        
+        threads = [threading.Thread(target=worker, args=(headers,)) for headers in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        everything = [value for values in latencies.values() for value in values]
+        return {
+            'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'config': {
+                'database': args.database or 'seeded temporary SQLite file',
+                'profile': args.profile,
+                'products': len(catalog[0]),
+                'transactions': None if args.database else args.transactions,
+                'threads': args.threads,
+                'seconds': args.seconds,
+                'mix': args.mix,
+            },
+            'total': {**summarize(everything, elapsed), 'failed': sum(failures.values())},
+            'endpoints': {
+                endpoint: {**summarize(latencies[endpoint], elapsed), 'failed': failures[endpoint]}
+                for endpoint in sorted(latencies)
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--database', help='SQLAlchemy URL of an already seeded database')
+    parser.add_argument('--profile', default='production', help='DB_PROFILE to run with')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='e.g. scan=60,stock_out=15,stock_in=5,list=12,low_stock=8')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/load-<time>.json)')
+    args = parser.parse_args()
+    
+    results = run(args)
+    output = args.output or os.path.join(
+        os.path.dirname(__file__), 'results',
+        f"load-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f'Saved to {output}')
+
+
+if __name__ == '__main__':
+    main()
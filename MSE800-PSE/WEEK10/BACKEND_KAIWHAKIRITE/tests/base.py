@@ -0,0 +1,51 @@
+"""
+Shared fixtures for the API test suite.
+"""
+
+import unittest
+from app import create_app, db
+
+TEST_CONFIG = {
+    'TESTING': True,
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'SECRET_KEY': 'test-secret-key-with-enough-bytes-for-hs256',
+    'JWT_SECRET_KEY': 'test-secret-key-with-enough-bytes-for-hs256',
+    # Real strength is irrelevant here and the default costs ~0.3s per hash
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+}
+
+
+class ApiTestCase(unittest.TestCase):
+    """Fresh application and in-memory database per test, with a logged-in user."""
+    
+    config = {}
+    
+    def setUp(self):
+        """Create the app and log in as the first (rangatira) user."""
+        self.app = create_app({**TEST_CONFIG, **self.config})
+        self.client = self.app.test_client()
+        self.headers = self.login('rangatira', 'kupuhuna', role='rangatira')
+    
+    def tearDown(self):
+        """Drop every table so the next test starts clean."""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+    
+    def login(self, username, password, role='kaimahi'):
+        """Register a user and return the Authorization header for it."""
+        self.client.post('/api/auth/register', json={
+            'username': username, 'password': password, 'role': role
+        })
+        response = self.client.post('/api/auth/login', json={
+            'username': username, 'password': password
+        })
+        return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+    
+    def create_product(self, barcode, **fields):
+        """Create a product through the API and return its id."""
+        data = {'name': f'Product {barcode}', 'barcode': barcode, **fields}
+        response = self.client.post('/api/products/', json=data, headers=self.headers)
+        self.assertEqual(response.status_code, 201, response.get_json())
+        return response.get_json()['product_id']
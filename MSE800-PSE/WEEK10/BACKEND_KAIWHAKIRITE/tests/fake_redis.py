@@ -0,0 +1,95 @@
+"""
+In-memory stand-in for a Redis server, covering the commands RedisCache uses.
+Several clients can share one FakeRedisServer, like workers sharing a server.
+"""
+
+import queue
+from threading import Lock
+
+
+class FakeRedisServer:
+    """Hashes plus pub/sub channels shared by every client connected to it."""
+    
+    def __init__(self):
+        self.hashes = {}
+        self.subscribers = {}
+        self.lock = Lock()
+        self.down = False
+    
+    def client(self):
+        """A new connection to this server."""
+        return FakeRedis(self)
+
+
+class FakeRedis:
+    """The subset of the redis-py client API used by app.cache.RedisCache."""
+    
+    def __init__(self, server):
+        self.server = server
+    
+    def _check(self):
+        if self.server.down:
+            raise ConnectionError('fake server is down')
+    
+    def hget(self, name, key):
+        self._check()
+        with self.server.lock:
+            return self.server.hashes.get(name, {}).get(key)
+    
+    def hset(self, name, key, value):
+        self._check()
+        with self.server.lock:
+            self.server.hashes.setdefault(name, {})[key] = value
+    
+    def expire(self, name, seconds):
+        self._check()
+    
+    def delete(self, name):
+        self._check()
+        with self.server.lock:
+            self.server.hashes.pop(name, None)
+    
+    def publish(self, channel, message):
+        self._check()
+        with self.server.lock:
+            subscribers = list(self.server.subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.put({'type': 'message', 'channel': channel.encode(),
+                            'data': message.encode()})
+        return len(subscribers)
+    
+    def pipeline(self):
+        return FakePipeline(self)
+    
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self.server)
+
+
+class FakePipeline:
+    """Queues commands and runs them on execute()."""
+    
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((getattr(self.client, name), args))
+    
+    def execute(self):
+        return [command(*args) for command, args in self.commands]
+
+
+class FakePubSub:
+    """Subscription whose listen() blocks until a message is published."""
+    
+    def __init__(self, server):
+        self.server = server
+        self.messages = queue.Queue()
+    
+    def subscribe(self, channel):
+        with self.server.lock:
+            self.server.subscribers.setdefault(channel, []).append(self.messages)
+    
+    def listen(self):
+        while True:
+            yield self.messages.get()
@@ -0,0 +1,107 @@
+"""
+Tests for archiving old transactions and long-deleted products.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from app import db
+from app.archive import archive_stale_rows
+from app.models.models import (ArchivedProduct, ArchivedStockTransaction, Product,
+                               StockSnapshot, StockTransaction)
+from app.rollups import rebuild_rollups
+from tests.base import ApiTestCase
+
+
+class TestArchive(ApiTestCase):
+    """Archived rows leave the hot tables but stay visible where history is asked for."""
+    
+    def setUp(self):
+        """A live product with old and recent movements, and two deleted products."""
+        super().setUp()
+        now = datetime.utcnow()
+        self.old = now - timedelta(days=400)
+        with self.app.app_context():
+            live = Product(name='Live', barcode='L', quantity=12, threshold=1)
+            stale = Product(name='Stale', barcode='S', quantity=0, is_deleted=True,
+                            updated_at=now - timedelta(days=100))
+            recent = Product(name='Recent', barcode='R', quantity=0, is_deleted=True)
+            newest = Product(name='Newest', barcode='N', quantity=0)
+            db.session.add_all([live, stale, recent, newest])
+            db.session.flush()
+            db.session.add_all([
+                StockTransaction(product_id=live.id, type='in', quantity=10, date=self.old),
+                StockTransaction(product_id=stale.id, type='in', quantity=3, date=self.old),
+                StockTransaction(product_id=stale.id, type='out', quantity=3, date=self.old),
+                StockTransaction(product_id=live.id, type='in', quantity=2, date=now),
+                StockSnapshot(product_id=stale.id, taken_at=self.old, quantity=3),
+            ])
+            db.session.commit()
+            self.live, self.stale, self.recent = live.id, stale.id, recent.id
+            rebuild_rollups()
+            self.assertEqual(archive_stale_rows(product_days=90, transaction_days=365), (1, 3))
+    
+    def get(self, url, **params):
+        """GET url and return the JSON body."""
+        response = self.client.get(url, query_string=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+    
+    def test_rows_move_out_of_hot_tables(self):
+        """Only old transactions and long-deleted products without hot history move."""
+        with self.app.app_context():
+            self.assertEqual(db.session.query(StockTransaction).count(), 1)
+            self.assertEqual(db.session.query(ArchivedStockTransaction).count(), 3)
+            self.assertEqual([p.id for p in ArchivedProduct.query.all()], [self.stale])
+            self.assertIsNone(db.session.get(Product, self.stale))
+            self.assertIsNotNone(db.session.get(Product, self.recent))
+            self.assertEqual(db.session.query(StockSnapshot).count(), 0)
+    
+    def test_listings_read_the_archive_transparently(self):
+        """include_deleted and old date ranges include archived rows; recent ranges do not."""
+        self.assertNotIn(self.stale, [p['id'] for p in self.get('/api/products/')])
+        deleted = self.get('/api/products/', include_deleted='true')
+        self.assertEqual([p['id'] for p in deleted][:3], [self.live, self.stale, self.recent])
+        
+        self.assertEqual(len(self.get('/api/transactions/')), 4)
+        since_old = (self.old - timedelta(days=1)).isoformat()
+        self.assertEqual(len(self.get('/api/transactions/', start_date=since_old)), 4)
+        since_recent = (datetime.utcnow() - timedelta(days=30)).isoformat()
+        self.assertEqual(len(self.get('/api/transactions/', start_date=since_recent)), 1)
+    
+    def test_history_still_adds_up(self):
+        """Stock-as-of and rebuilt rollups still count archived movements."""
+        before = (self.old - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.get('/api/transactions/stock-as-of', product_id=self.live,
+                                  date=before)['quantity'], 0)
+        with self.app.app_context():
+            rebuild_rollups()
+        movement = self.get('/api/transactions/movement', period='day', product_id=self.live)
+        self.assertEqual(sum(row['quantity'] for row in movement), 12)
+    
+    def test_change_feed_keeps_tombstones_of_archived_products(self):
+        """A client that synced before a delete still learns of it after archiving."""
+        watermark = self.get('/api/products/changes')['next_since']
+        self.client.delete(f'/api/products/{self.recent}', headers=self.headers)
+        with self.app.app_context():
+            db.session.execute(db.update(Product).where(Product.id == self.recent).values(
+                updated_at=datetime.utcnow() - timedelta(days=100)))
+            db.session.commit()
+            self.assertEqual(archive_stale_rows(product_days=90, transaction_days=365), (1, 0))
+        
+        feed = self.get('/api/products/changes', since=watermark)
+        self.assertEqual([(c['id'], c['is_deleted']) for c in feed['changes']],
+                         [(self.recent, True)])
+    
+    def test_newest_row_is_never_archived(self):
+        """The highest id stays hot so SQLite cannot reissue an archived id."""
+        with self.app.app_context():
+            newest = db.session.query(db.func.max(Product.id)).scalar()
+            db.session.execute(db.update(Product).where(Product.id == newest).values(
+                is_deleted=True, updated_at=datetime.utcnow() - timedelta(days=100)))
+            db.session.commit()
+            self.assertEqual(archive_stale_rows(product_days=90, transaction_days=365), (0, 0))
+            self.assertIsNotNone(db.session.get(Product, newest))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests for the barcode lookup cache and its invalidation.
+"""
+
+import unittest
+from app.cache import LRUCache
+from tests.base import ApiTestCase
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    """Eviction, expiry and counters of the cache itself."""
+    
+    def test_evicts_least_recently_used(self):
+        """The oldest untouched key goes first when the cache is full."""
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+    
+    def test_entries_expire(self):
+        """Entries older than the TTL count as misses."""
+        clock = FakeClock()
+        cache = LRUCache(maxsize=10, ttl=5, clock=clock)
+        cache.set('a', 1)
+        clock.now = 4.9
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 5.0
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+    
+    def test_set_after_invalidation_is_dropped(self):
+        """A value read before an invalidation is not cached after it."""
+        cache = LRUCache(maxsize=10)
+        generation = cache.generation()
+        cache.invalidate('a')
+        cache.set('a', 'stale', generation)
+        self.assertEqual(cache.get('a'), None)
+        cache.set('a', 'fresh', cache.generation())
+        self.assertEqual(cache.get('a'), 'fresh')
+
+
+class TestBarcodeLookupCache(ApiTestCase):
+    """Writes through the API never leave a stale cached product behind."""
+    
+    def scan(self, barcode):
+        """Look a barcode up the way the till does."""
+        return self.client.get(f'/api/products/barcode/{barcode}', headers=self.headers)
+    
+    def stats(self):
+        """Barcode cache counters."""
+        return self.client.get('/api/products/cache-stats', headers=self.headers).get_json()['barcode']
+    
+    def test_repeat_scans_hit_the_cache(self):
+        """Only the first scan misses."""
+        self.create_product('9400001', quantity=4)
+        for _ in range(3):
+            self.assertEqual(self.scan('9400001').get_json()['quantity'], 4)
+        self.assertEqual((self.stats()['hits'], self.stats()['misses']), (2, 1))
+    
+    def test_transaction_invalidates(self):
+        """A stock movement is visible on the next scan."""
+        product = self.create_product('9400001', quantity=4)
+        self.scan('9400001')
+        self.client.post('/api/transactions/', json={
+            'product_id': product, 'type': 'out', 'quantity': 3
+        }, headers=self.headers)
+        self.assertEqual(self.scan('9400001').get_json()['quantity'], 1)
+    
+    def test_write_between_query_and_set_is_not_cached(self):
+        """A stock movement that lands while a scan is mid-flight wins."""
+        product = self.create_product('9400001', quantity=4)
+        cache = self.app.extensions['barcode_cache']
+        real_set = cache.set
+        
+        def write_then_set(key, value, generation=None):
+            # The scan has already read quantity 4; the movement commits and
+            # invalidates before the scan gets to store what it read
+            cache.set = real_set
+            self.app.test_client().post('/api/transactions/', json={
+                'product_id': product, 'type': 'out', 'quantity': 3
+            }, headers=self.headers)
+            real_set(key, value, generation)
+        
+        cache.set = write_then_set
+        self.assertEqual(self.scan('9400001').get_json()['quantity'], 4)
+        self.assertEqual(self.scan('9400001').get_json()['quantity'], 1)
+    
+    def test_update_delete_restore_invalidate(self):
+        """Product writes drop both the old and the new barcode."""
+        product = self.create_product('9400001', name='Kūmara')
+        self.scan('9400001')
+        self.client.put(f'/api/products/{product}', json={'barcode': '9400002'},
+                        headers=self.headers)
+        self.assertEqual(self.scan('9400001').status_code, 404)
+        self.assertEqual(self.scan('9400002').status_code, 200)
+        
+        self.client.delete(f'/api/products/{product}', headers=self.headers)
+        self.assertEqual(self.scan('9400002').status_code, 404)
+        self.client.post(f'/api/products/{product}/restore', headers=self.headers)
+        self.assertEqual(self.scan('9400002').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Tests for POST /api/transactions/batch.
+"""
+
+import json
+import unittest
+from sqlalchemy import event
+from app import db
+from tests.base import ApiTestCase
+
+
+class TestBatchTransactions(ApiTestCase):
+    """A batch is validated as a whole and written in one commit."""
+    
+    def setUp(self):
+        """Two products to receive and issue stock against."""
+        super().setUp()
+        self.flour = self.create_product('FLOUR', quantity=10, threshold=5)
+        self.sugar = self.create_product('SUGAR', quantity=2, threshold=1)
+    
+    def post_batch(self, lines):
+        """Submit a batch and return the response."""
+        return self.client.post('/api/transactions/batch', json={'transactions': lines},
+                                headers=self.headers)
+    
+    def quantities(self):
+        """Current quantity per product id."""
+        response = self.client.get('/api/products/', headers=self.headers)
+        return {p['id']: p['quantity'] for p in response.get_json()}
+    
+    def test_batch_applies_every_line(self):
+        """Lines are applied in order and reported with running quantities."""
+        response = self.post_batch([
+            {'product_id': self.flour, 'type': 'in', 'quantity': 5},
+            {'product_id': self.flour, 'type': 'out', 'quantity': 12},
+            {'product_id': self.sugar, 'type': 'in', 'quantity': 3, 'notes': 'delivery'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        results = response.get_json()['results']
+        self.assertEqual([r['new_quantity'] for r in results], [15, 3, 5])
+        self.assertEqual(self.quantities(), {self.flour: 3, self.sugar: 5})
+        
+        transactions = self.client.get('/api/transactions/', headers=self.headers).get_json()
+        self.assertEqual(len(transactions), 3)
+        
+        low = self.client.get('/api/transactions/low-stock', headers=self.headers).get_json()
+        self.assertEqual([p['id'] for p in low], [self.flour])
+    
+    def test_one_bad_line_rejects_the_batch(self):
+        """Nothing is written when any line fails, and each failure is reported."""
+        response = self.post_batch([
+            {'product_id': self.flour, 'type': 'in', 'quantity': 5},
+            {'product_id': self.sugar, 'type': 'out', 'quantity': 3},
+            {'product_id': 999, 'type': 'in', 'quantity': 1},
+            {'product_id': self.flour, 'type': 'sideways', 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        results = response.get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['ok', 'error', 'error', 'error'])
+        self.assertEqual(results[1]['error'], 'Insufficient stock')
+        self.assertEqual(results[2]['error'], 'Product not found')
+        self.assertEqual(self.quantities(), {self.flour: 10, self.sugar: 2})
+        self.assertEqual(self.client.get('/api/transactions/', headers=self.headers).get_json(), [])
+    
+    def test_boolean_product_id_is_not_an_id(self):
+        """true is refused rather than read as product 1."""
+        response = self.post_batch([{'product_id': True, 'type': 'in', 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['results'][0]['error'], 'Product not found')
+        self.assertEqual(self.quantities(), {self.flour: 10, self.sugar: 2})
+    
+    def test_reports_quantities_after_concurrent_movement(self):
+        """Results and events show the stock written, not the stock validated against."""
+        subscriber, _ = self.app.extensions['event_broker'].subscribe()
+        
+        def stock_out_elsewhere(conn, cursor, statement, parameters, context, executemany):
+            # Another worker takes 4 flour between the batch's read and its UPDATE
+            if statement.startswith('UPDATE products SET quantity'):
+                cursor.connection.execute(
+                    'UPDATE products SET quantity = quantity - 4 WHERE id = ?', (self.flour,))
+        
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', stock_out_elsewhere)
+            try:
+                response = self.post_batch([
+                    {'product_id': self.flour, 'type': 'out', 'quantity': 2},
+                    {'product_id': self.flour, 'type': 'out', 'quantity': 1},
+                ])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', stock_out_elsewhere)
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['new_quantity'] for r in response.get_json()['results']], [4, 3])
+        self.assertEqual(self.quantities()[self.flour], 3)
+        
+        events = []
+        while not subscriber.queue.empty():
+            fields = dict(line.split(': ', 1)
+                          for line in subscriber.queue.get_nowait().decode().strip().split('\n'))
+            events.append((fields['event'], json.loads(fields['data'])))
+        self.assertEqual(events, [
+            ('stock', {'product_id': self.flour, 'quantity': 3, 'low_stock': True}),
+            ('low-stock', {'product_id': self.flour, 'quantity': 3, 'threshold': 5,
+                           'low_stock': True}),
+        ])
+    
+    def test_empty_batch(self):
+        """An empty or missing list is rejected."""
+        self.assertEqual(self.post_batch([]).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Multi-threaded stress test for stock transactions.
+Many workers hit the same product at once on a file-backed SQLite database;
+every accepted movement must be reflected exactly once in the final quantity.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from tests.base import ApiTestCase
+
+THREADS = 8
+REQUESTS_PER_THREAD = 40
+INITIAL_STOCK = 100
+
+
+class TestConcurrentStockMovements(ApiTestCase):
+    """Conditional UPDATEs keep quantities exact under concurrent workers."""
+    
+    def setUp(self):
+        """Use a real database file so threads get their own connections."""
+        handle, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}'}
+        super().setUp()
+    
+    def tearDown(self):
+        """Remove the database file."""
+        super().tearDown()
+        os.remove(self.db_path)
+    
+    def test_no_lost_updates(self):
+        """Every thread alternates stock-outs and stock-ins against one product."""
+        product = self.create_product('HOT', quantity=INITIAL_STOCK, threshold=10)
+        accepted = {'in': 0, 'out': 0}
+        rejected = []
+        errors = []
+        lock = threading.Lock()
+        
+        def worker(worker_id):
+            client = self.app.test_client()
+            for i in range(REQUESTS_PER_THREAD):
+                # Mostly stock-outs, so the product runs dry part way through
+                kind = 'in' if i % 4 == 0 else 'out'
+                response = client.post('/api/transactions/', json={
+                    'product_id': product, 'type': kind, 'quantity': 1
+                }, headers=self.headers)
+                with lock:
+                    if response.status_code == 201:
+                        accepted[kind] += 1
+                        if response.get_json()['new_quantity'] < 0:
+                            errors.append('negative stock')
+                    elif response.get_json() == {'error': 'Insufficient stock'}:
+                        rejected.append(worker_id)
+                    else:
+                        errors.append(response.get_json())
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        total = THREADS * REQUESTS_PER_THREAD
+        print(f'\n{total} stock transactions from {THREADS} threads in {elapsed:.2f}s '
+              f'({total / elapsed:.0f} transactions/second), {len(rejected)} refused')
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(accepted['in'] + accepted['out'] + len(rejected), total)
+        
+        products = self.client.get('/api/products/', headers=self.headers).get_json()
+        final = products[0]['quantity']
+        self.assertEqual(final, INITIAL_STOCK + accepted['in'] - accepted['out'])
+        self.assertGreaterEqual(final, 0)
+        
+        transactions = self.client.get(f'/api/transactions/?product_id={product}',
+                                       headers=self.headers).get_json()
+        self.assertEqual(len(transactions), accepted['in'] + accepted['out'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests for the database connection profiles.
+"""
+
+import os
+import tempfile
+import unittest
+from sqlalchemy import text
+from app import db
+from app.database import database_settings
+from tests.base import ApiTestCase
+
+
+class TestDatabaseSettings(unittest.TestCase):
+    """Profiles resolve to pragmas and engine options."""
+    
+    def settings(self, uri, **config):
+        """Resolve settings for uri with the production profile."""
+        return database_settings({'DB_PROFILE': 'production',
+                                  'SQLALCHEMY_DATABASE_URI': uri, **config})
+    
+    def test_overrides(self):
+        """Individual values can be overridden from config."""
+        pragmas, engine = self.settings('sqlite:///x.db', SQLITE_SYNCHRONOUS='FULL',
+                                        DB_POOL_SIZE='3')
+        self.assertEqual(pragmas['synchronous'], 'FULL')
+        self.assertEqual(engine['pool_size'], 3)
+        self.assertTrue(engine['pool_pre_ping'])
+    
+    def test_memory_database_has_no_pool_sizing(self):
+        """In-memory SQLite keeps its single static connection."""
+        pragmas, engine = self.settings('sqlite://')
+        self.assertNotIn('pool_size', engine)
+        self.assertNotIn('journal_mode', pragmas)
+    
+    def test_other_databases_get_no_pragmas(self):
+        """PRAGMAs are only sent to SQLite."""
+        self.assertEqual(self.settings('postgresql://db/inventory')[0], {})
+    
+    def test_unknown_profile(self):
+        """A typo in DB_PROFILE fails loudly."""
+        with self.assertRaises(ValueError):
+            database_settings({'DB_PROFILE': 'prod', 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+
+class TestProductionProfile(ApiTestCase):
+    """Every pooled connection of a file database gets the production pragmas."""
+    
+    def setUp(self):
+        """Use a database file so WAL can be enabled."""
+        handle, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        self.config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.db_path}',
+                       'DB_PROFILE': 'production'}
+        super().setUp()
+    
+    def tearDown(self):
+        """Remove the database and its WAL files."""
+        super().tearDown()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+    
+    def test_pragmas_applied(self):
+        """WAL, synchronous=NORMAL and busy_timeout are active."""
+        with self.app.app_context():
+            with db.engine.connect() as conn:
+                pragma = lambda name: conn.execute(text(f'PRAGMA {name}')).scalar()
+                self.assertEqual(pragma('journal_mode'), 'wal')
+                self.assertEqual(pragma('synchronous'), 1)
+                self.assertEqual(pragma('busy_timeout'), 5000)
+            self.assertEqual(db.engine.pool.size(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
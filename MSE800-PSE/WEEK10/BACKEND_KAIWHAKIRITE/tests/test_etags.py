@@ -0,0 +1,72 @@
+"""
+Tests for conditional GET on the product and supplier listings.
+"""
+
+import unittest
+from sqlalchemy import event
+from app import db
+from tests.base import ApiTestCase
+
+
+class TestListingETags(ApiTestCase):
+    """Unchanged listings answer 304 without touching the listed table."""
+    
+    def get(self, url, etag=None):
+        """GET url, optionally revalidating etag."""
+        headers = dict(self.headers)
+        if etag:
+            headers['If-None-Match'] = etag
+        return self.client.get(url, headers=headers)
+    
+    def test_not_modified_skips_listing_query(self):
+        """A matching If-None-Match is answered from the version counter alone."""
+        self.create_product('A')
+        etag = self.get('/api/products/').headers['ETag']
+        
+        statements = []
+        with self.app.app_context():
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.get('/api/products/', etag)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertFalse([s for s in statements if 'FROM products' in s])
+    
+    def test_product_writes_change_the_etag(self):
+        """Product edits and stock movements both invalidate the catalog ETag."""
+        product = self.create_product('A', quantity=5)
+        etag = self.get('/api/products/').headers['ETag']
+        
+        self.client.post('/api/transactions/', json={
+            'product_id': product, 'type': 'in', 'quantity': 1
+        }, headers=self.headers)
+        response = self.get('/api/products/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]['quantity'], 6)
+        
+        etag = response.headers['ETag']
+        self.client.put(f'/api/products/{product}', json={'name': 'B'}, headers=self.headers)
+        self.assertEqual(self.get('/api/products/', etag).status_code, 200)
+    
+    def test_etag_depends_on_query(self):
+        """Different pages of the same listing never share an ETag."""
+        self.create_product('A')
+        first = self.get('/api/products/').headers['ETag']
+        paged = self.get('/api/products/?limit=1').headers['ETag']
+        self.assertNotEqual(first, paged)
+        self.assertEqual(self.get('/api/products/?limit=1', first).status_code, 200)
+    
+    def test_supplier_listing(self):
+        """Suppliers revalidate until one is added."""
+        etag = self.get('/api/suppliers/').headers['ETag']
+        self.assertEqual(self.get('/api/suppliers/', etag).status_code, 304)
+        self.client.post('/api/suppliers/', json={'name': 'Te Awa'}, headers=self.headers)
+        self.assertEqual(self.get('/api/suppliers/', etag).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests for the server-sent event stream of stock changes.
+"""
+
+import json
+import unittest
+from sqlalchemy import event
+from app import db
+from app.events import BrokerFull, EventBroker
+from tests.base import ApiTestCase
+
+
+def parse(frame):
+    """Split one SSE frame into a dict of its fields, with data decoded."""
+    fields = dict(line.split(': ', 1) for line in frame.decode().strip().split('\n'))
+    if 'data' in fields:
+        fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+class TestEventBroker(unittest.TestCase):
+    """Fan-out, resume and slow-client handling of the in-process broker."""
+    
+    def test_every_subscriber_gets_each_event(self):
+        """One publish reaches all subscribers."""
+        broker = EventBroker()
+        subscribers = [broker.subscribe()[0] for _ in range(3)]
+        broker.publish('stock', {'product_id': 1, 'quantity': 5})
+        for subscriber in subscribers:
+            self.assertEqual(parse(subscriber.queue.get_nowait())['data'],
+                             {'product_id': 1, 'quantity': 5})
+    
+    def test_resume_from_last_event_id(self):
+        """Reconnecting with an id replays exactly the events after it."""
+        broker = EventBroker()
+        _, [ready] = broker.subscribe()
+        broker.publish('stock', {'n': 1})
+        broker.publish('stock', {'n': 2})
+        _, backlog = broker.subscribe(parse(ready)['id'])
+        self.assertEqual([parse(frame)['data'] for frame in backlog], [{'n': 1}, {'n': 2}])
+        
+        _, backlog = broker.subscribe(parse(backlog[0])['id'])
+        self.assertEqual([parse(frame)['data'] for frame in backlog], [{'n': 2}])
+    
+    def test_refresh_when_history_does_not_reach_back(self):
+        """Ids older than the history or from another run get a refresh event."""
+        broker = EventBroker(history=2)
+        _, [ready] = broker.subscribe()
+        for n in range(3):
+            broker.publish('stock', {'n': n})
+        for last_event_id in (parse(ready)['id'], '1-1', 'garbage'):
+            with self.subTest(last_event_id=last_event_id):
+                _, [frame] = broker.subscribe(last_event_id)
+                self.assertEqual(parse(frame)['event'], 'refresh')
+    
+    def test_slow_subscriber_is_cut_off(self):
+        """A full queue disconnects the client instead of blocking the writer."""
+        broker = EventBroker(queue_size=2)
+        subscriber, backlog = broker.subscribe()
+        for n in range(3):
+            broker.publish('stock', {'n': n})
+        self.assertTrue(subscriber.closed)
+        # The stream still delivers what was queued, then ends
+        frames = list(broker.stream(subscriber, backlog, heartbeat=0.01))
+        self.assertEqual([parse(frame).get('data') for frame in frames[2:]], [{'n': 0}, {'n': 1}])
+        self.assertEqual(broker.stats()['disconnected'], 1)
+    
+    def test_subscriber_limit(self):
+        """Beyond max_subscribers new clients are refused."""
+        broker = EventBroker(max_subscribers=1)
+        broker.subscribe()
+        with self.assertRaises(BrokerFull):
+            broker.subscribe()
+
+
+class TestEventStream(ApiTestCase):
+    """GET /api/events pushes stock and threshold changes from every write path."""
+    
+    config = {'EVENTS_HEARTBEAT': 0.05}
+    
+    def setUp(self):
+        """Open one event stream before any write happens."""
+        super().setUp()
+        self.product = self.create_product('1', quantity=10, threshold=5)
+        self.response = self.client.get('/api/events/', headers=self.headers)
+        self.assertEqual(self.response.status_code, 200)
+        self.assertEqual(self.response.mimetype, 'text/event-stream')
+        self.frames = iter(self.response.response)
+        self.assertTrue(next(self.frames).startswith(b'retry: '))
+        self.assertEqual(parse(next(self.frames))['event'], 'ready')
+    
+    def tearDown(self):
+        """Close the stream so the subscriber is released."""
+        self.response.close()
+        super().tearDown()
+    
+    def events(self):
+        """Events received since the last call (waits one heartbeat for the end)."""
+        received = []
+        for frame in self.frames:
+            if frame.startswith(b':'):
+                return received
+            fields = parse(frame)
+            received.append((fields['event'], fields['data']))
+    
+    def test_transaction_crossing_threshold(self):
+        """A stock-out below the threshold sends the new quantity and the alert."""
+        self.client.post('/api/transactions/', json={
+            'product_id': self.product, 'type': 'out', 'quantity': 6}, headers=self.headers)
+        self.client.post('/api/transactions/', json={
+            'product_id': self.product, 'type': 'out', 'quantity': 1}, headers=self.headers)
+        self.assertEqual(self.events(), [
+            ('stock', {'product_id': self.product, 'quantity': 4, 'low_stock': True}),
+            ('low-stock', {'product_id': self.product, 'quantity': 4, 'threshold': 5,
+                           'low_stock': True}),
+            ('stock', {'product_id': self.product, 'quantity': 3, 'low_stock': True}),
+        ])
+    
+    def test_batch_and_product_writes(self):
+        """Batches, threshold edits and deletes publish only what changed."""
+        self.client.post('/api/transactions/batch', json={'transactions': [
+            {'product_id': self.product, 'type': 'in', 'quantity': 2},
+            {'product_id': self.product, 'type': 'out', 'quantity': 2}]}, headers=self.headers)
+        self.client.put(f'/api/products/{self.product}', json={'threshold': 20},
+                        headers=self.headers)
+        self.client.delete(f'/api/products/{self.product}', headers=self.headers)
+        self.assertEqual(self.events(), [
+            ('low-stock', {'product_id': self.product, 'quantity': 10, 'threshold': 20,
+                           'low_stock': True}),
+            ('low-stock', {'product_id': self.product, 'quantity': 10, 'threshold': 20,
+                           'low_stock': False}),
+        ])
+    
+    def test_failed_write_publishes_nothing(self):
+        """A refused stock-out is rolled back and never announced."""
+        response = self.client.post('/api/transactions/', json={
+            'product_id': self.product, 'type': 'out', 'quantity': 99}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.events(), [])
+    
+    def test_stream_runs_no_sql(self):
+        """Subscribing and receiving events costs no database work per client."""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.client.get('/api/events/', headers=self.headers)
+                frames = iter(response.response)
+                self.app.extensions['event_broker'].publish('stock', {'product_id': 1})
+                self.assertIn(b'event: stock', b''.join([next(frames) for _ in range(3)]))
+                response.close()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(statements, [])
+    
+    def test_token_in_query_string(self):
+        """EventSource cannot send headers, so ?jwt= is accepted too."""
+        token = self.headers['Authorization'].split()[1]
+        response = self.client.get('/api/events/', query_string={'jwt': token})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertEqual(self.client.get('/api/events/').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Tests for the stock-out forecast.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from app import db, forecast
+from app.models.models import Product, StockTransaction, User
+from app.rollups import rebuild_rollups
+from tests.base import ApiTestCase
+
+
+@unittest.skipIf(forecast.np is None, 'numpy is not installed')
+class TestForecast(ApiTestCase):
+    """Consumption, stock-out dates and reorder points come from the daily rollups."""
+    
+    def add_product(self, barcode, quantity, threshold=None, age_days=365):
+        """Insert a product created age_days ago and return its id."""
+        with self.app.app_context():
+            product = Product(name=f'Product {barcode}', barcode=barcode, quantity=quantity,
+                              threshold=threshold,
+                              created_at=datetime.utcnow() - timedelta(days=age_days))
+            db.session.add(product)
+            db.session.commit()
+            return product.id
+    
+    def add_usage(self, product_id, quantities):
+        """Record one stock-out per quantity, on consecutive days ending yesterday."""
+        with self.app.app_context():
+            user = User.query.filter_by(username='rangatira').one()
+            noon = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+            for back, quantity in enumerate(reversed(quantities), start=1):
+                if quantity:
+                    db.session.add(StockTransaction(product_id=product_id, user_id=user.id,
+                                                    type='out', quantity=quantity,
+                                                    date=noon - timedelta(days=back)))
+            db.session.commit()
+            rebuild_rollups()
+    
+    def get_forecast(self, status=200, **params):
+        """Call the forecast endpoint and return its JSON body."""
+        response = self.client.get('/api/products/forecast', query_string=params,
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, status, response.get_json())
+        return response.get_json()
+    
+    def test_moving_average_forecast(self):
+        """A steady 2 units a day over 30 days runs 40 units out in 20 days."""
+        product = self.add_product('1', quantity=40, threshold=5)
+        self.add_usage(product, [2] * 30)
+        [row] = self.get_forecast(method='sma', days=30, lead_time=5)
+        
+        today = datetime.utcnow().date()
+        self.assertEqual(row['product_id'], product)
+        self.assertEqual(row['daily_consumption'], 2.0)
+        self.assertEqual(row['days_until_stockout'], 20.0)
+        self.assertEqual(row['predicted_stockout_date'], (today + timedelta(days=20)).isoformat())
+        # no variation, so no safety stock on top of 5 days of usage
+        self.assertEqual(row['suggested_reorder_point'], 10)
+        self.assertEqual(row['threshold'], 5)
+    
+    def test_variable_usage_adds_safety_stock(self):
+        """Uneven usage raises the reorder point with the service level."""
+        product = self.add_product('1', quantity=100)
+        self.add_usage(product, [0, 4] * 15)
+        low = self.get_forecast(method='sma', days=30, service_level=0.9)[0]
+        high = self.get_forecast(method='sma', days=30, service_level=0.99)[0]
+        self.assertEqual(low['daily_consumption'], 2.0)
+        self.assertGreater(low['suggested_reorder_point'], 14)
+        self.assertGreater(high['suggested_reorder_point'], low['suggested_reorder_point'])
+    
+    def test_ema_follows_recent_usage(self):
+        """The exponential average leans toward the latest days."""
+        product = self.add_product('1', quantity=100)
+        self.add_usage(product, [1] * 20 + [5] * 10)
+        sma = self.get_forecast(method='sma', days=30)[0]['daily_consumption']
+        ema = self.get_forecast(method='ema', days=30, span=7)[0]['daily_consumption']
+        self.assertAlmostEqual(sma, 70 / 30, places=3)
+        self.assertGreater(ema, sma)
+    
+    def test_new_product_averaged_over_its_lifetime(self):
+        """A product created 10 days ago is not diluted by days before it existed."""
+        product = self.add_product('1', quantity=30, age_days=10)
+        self.add_usage(product, [3] * 10)
+        [row] = self.get_forecast(method='sma', days=90)
+        self.assertEqual(row['daily_consumption'], 3.0)
+    
+    def test_most_urgent_first_and_idle_products_last(self):
+        """Products are ordered by days left; unused and deleted products never run out."""
+        slow = self.add_product('1', quantity=100)
+        fast = self.add_product('2', quantity=10)
+        idle = self.add_product('3', quantity=0)
+        deleted = self.add_product('4', quantity=1)
+        self.add_usage(slow, [1] * 30)
+        self.add_usage(fast, [1] * 30)
+        self.add_usage(deleted, [1] * 30)
+        self.client.delete(f'/api/products/{deleted}', headers=self.headers)
+        
+        rows = self.get_forecast(method='sma', days=30)
+        self.assertEqual([row['product_id'] for row in rows], [fast, slow, idle])
+        self.assertIsNone(rows[-1]['days_until_stockout'])
+        self.assertIsNone(rows[-1]['predicted_stockout_date'])
+        self.assertEqual(rows[-1]['suggested_reorder_point'], 0)
+        self.assertEqual([row['product_id'] for row in self.get_forecast(limit=1)], [fast])
+        self.assertEqual([row['product_id'] for row in self.get_forecast(product_id=slow)], [slow])
+    
+    def test_invalid_parameters(self):
+        """Out-of-range or unknown parameters are rejected."""
+        for params in ({'days': 0}, {'days': 731}, {'days': 'x'}, {'method': 'arima'},
+                       {'span': 0}, {'lead_time': -1}, {'service_level': 0.5}, {'limit': 0},
+                       {'product_id': 'abc'}):
+            with self.subTest(params=params):
+                self.assertIn('error', self.get_forecast(400, **params))
+    
+    def test_requires_login(self):
+        """The forecast is not public."""
+        response = self.client.get('/api/products/forecast')
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
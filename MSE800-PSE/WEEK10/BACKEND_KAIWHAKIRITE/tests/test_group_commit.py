@@ -0,0 +1,85 @@
+"""
+Tests for the group-commit write path of POST /api/transactions.
+"""
+
+import threading
+import unittest
+from concurrent.futures import Future
+from app import db
+from app.models.models import Product, StockTransaction
+from app.stock import InsufficientStock
+from tests.base import ApiTestCase
+
+
+class TestGroupCommit(ApiTestCase):
+    """With STOCK_WRITE_MODE=group one writer thread commits movements in batches."""
+    
+    config = {'STOCK_WRITE_MODE': 'group'}
+    
+    def tearDown(self):
+        """Stop the writer thread before the tables are dropped."""
+        self.app.extensions['stock_writer'].shutdown()
+        super().tearDown()
+    
+    def post(self, product_id, type, quantity):
+        """Create one transaction through the API; returns the response."""
+        return self.client.post('/api/transactions/', json={
+            'product_id': product_id, 'type': type, 'quantity': quantity}, headers=self.headers)
+    
+    def test_responses_match_direct_mode(self):
+        """Success, insufficient stock and unknown products answer as before."""
+        product = self.create_product('1', quantity=5)
+        response = self.post(product, 'out', 2)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['new_quantity'], 3)
+        self.assertEqual(self.post(product, 'out', 4).status_code, 400)
+        self.assertEqual(self.post(999, 'in', 1).status_code, 404)
+    
+    def test_concurrent_stock_outs_never_oversell(self):
+        """Twenty racing requests for ten units: exactly ten succeed, all committed."""
+        product = self.create_product('1', quantity=10)
+        statuses = []
+        
+        def take_one():
+            client = self.app.test_client()
+            response = client.post('/api/transactions/', json={
+                'product_id': product, 'type': 'out', 'quantity': 1}, headers=self.headers)
+            statuses.append(response.status_code)
+        
+        threads = [threading.Thread(target=take_one) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(sorted(statuses), [201] * 10 + [400] * 10)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Product, product).quantity, 0)
+            self.assertEqual(StockTransaction.query.count(), 10)
+        stats = self.app.extensions['stock_writer'].stats()
+        self.assertEqual(stats['movements'], 20)
+        self.assertLessEqual(stats['batches'], 20)
+    
+    def test_failing_movement_does_not_sink_its_batch(self):
+        """An unexpected error only fails its own request; the others still commit."""
+        product = self.create_product('1', quantity=5)
+        writer = self.app.extensions['stock_writer']
+        movements = [
+            (product, 'out', 1, 1, None),
+            (product, 'in', 1, 1, {'not': 'bindable'}),
+            (product, 'out', 10, 1, None),
+            (product, 'out', 2, 1, None),
+        ]
+        futures = [Future() for _ in movements]
+        with self.app.app_context():
+            writer._apply(list(zip(movements, futures)))
+            self.assertEqual(db.session.get(Product, product).quantity, 2)
+        
+        self.assertEqual(futures[0].result().quantity, 4)
+        self.assertIsNotNone(futures[1].exception())
+        self.assertIsInstance(futures[2].exception(), InsufficientStock)
+        self.assertEqual(futures[3].result().quantity, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
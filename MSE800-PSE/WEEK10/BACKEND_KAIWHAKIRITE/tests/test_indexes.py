@@ -0,0 +1,101 @@
+"""
+Query-plan tests for the inventory indexes.
+Runs the real endpoints, captures the SQL they issue and checks it with
+EXPLAIN QUERY PLAN.
+"""
+
+import re
+import unittest
+from sqlalchemy import event, inspect, text
+from app import db
+from app.schema import upgrade_schema
+from tests.base import ApiTestCase
+
+
+class TestIndexUsage(ApiTestCase):
+    """The hot read paths must be served by an index, not a table scan."""
+    
+    def capture_plans(self, url, table):
+        """Call url and return the query plan of every SELECT on table."""
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT') and re.search(rf'FROM {table}\b', statement):
+                statements.append((statement, parameters))
+        
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+            try:
+                response = self.client.get(url, headers=self.headers)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(statements, f'{url} issued no query against {table}')
+            
+            with db.engine.connect() as conn:
+                return [
+                    ' '.join(row[-1] for row in conn.exec_driver_sql(
+                        'EXPLAIN QUERY PLAN ' + statement, parameters))
+                    for statement, parameters in statements
+                ]
+    
+    def test_transactions_by_product_and_date(self):
+        """Filtering by product and date searches the (product_id, date) index."""
+        for plan in self.capture_plans(
+                '/api/transactions/?product_id=1&start_date=2024-01-01', 'stock_transactions'):
+            self.assertIn('ix_stock_transactions_product_id_date', plan)
+    
+    def test_transactions_by_date_range(self):
+        """A plain date range searches the date index."""
+        for plan in self.capture_plans(
+                '/api/transactions/?start_date=2024-01-01&end_date=2024-02-01', 'stock_transactions'):
+            self.assertIn('ix_stock_transactions_date', plan)
+    
+    def test_transactions_by_type_and_date(self):
+        """Filtering by type and date searches the (type, date) index."""
+        for plan in self.capture_plans(
+                '/api/transactions/?type=out&start_date=2024-01-01', 'stock_transactions'):
+            self.assertIn('ix_stock_transactions_type_date', plan)
+    
+    def test_low_stock_uses_partial_index(self):
+        """The low-stock alert reads only the partial low-stock index."""
+        for plan in self.capture_plans('/api/transactions/low-stock', 'products'):
+            self.assertIn('ix_products_is_low_stock', plan)
+
+
+class TestUpgradeSchema(ApiTestCase):
+    """upgrade_schema() adds columns and indexes to databases created before they existed."""
+    
+    def test_missing_indexes_are_created(self):
+        """Dropped indexes come back, and a second run is a no-op."""
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(text('DROP INDEX ix_stock_transactions_date'))
+                conn.execute(text('DROP INDEX ix_products_is_low_stock'))
+            
+            created = upgrade_schema()
+            self.assertEqual(sorted(created),
+                             ['ix_products_is_low_stock', 'ix_stock_transactions_date'])
+            
+            names = {i['name'] for i in inspect(db.engine).get_indexes('stock_transactions')}
+            self.assertIn('ix_stock_transactions_date', names)
+            self.assertEqual(upgrade_schema(), [])
+    
+    def test_missing_low_stock_column_is_backfilled(self):
+        """is_low_stock is added to an old products table and computed from the data."""
+        low = self.create_product('LOW', quantity=2, threshold=5)
+        ok = self.create_product('OK', quantity=9, threshold=5)
+        unset = self.create_product('UNSET', quantity=2)
+        with self.app.app_context():
+            with db.engine.begin() as conn:
+                conn.execute(text('DROP INDEX ix_products_is_low_stock'))
+                conn.execute(text('ALTER TABLE products DROP COLUMN is_low_stock'))
+            
+            self.assertIn('products.is_low_stock', upgrade_schema())
+            with db.engine.connect() as conn:
+                flags = dict(conn.execute(text('SELECT id, is_low_stock FROM products')).all())
+            self.assertEqual(flags, {low: 1, ok: 0, unset: 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the shared listing cache and its cross-worker invalidation.
+"""
+
+import time
+import unittest
+from sqlalchemy import event
+from app import db
+from app.cache import LocalCache, RedisCache
+from tests.base import ApiTestCase
+from tests.fake_redis import FakeRedisServer
+
+
+def wait_for(condition, timeout=2):
+    """Poll condition until it holds or timeout seconds pass."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestRedisCache(unittest.TestCase):
+    """Two workers' caches connected to one server stay consistent."""
+    
+    def setUp(self):
+        """Two workers, each with its own connection and listener thread."""
+        self.server = FakeRedisServer()
+        self.first = RedisCache(self.server.client())
+        self.second = RedisCache(self.server.client())
+        self.first.listen()
+        self.second.listen()
+    
+    def test_entries_are_shared(self):
+        """A listing cached by one worker is a hit in the other."""
+        self.first.set('products', 'etag', b'body')
+        self.assertEqual(self.second.get('products', 'etag'), b'body')
+    
+    def test_invalidation_reaches_other_workers(self):
+        """Invalidating in one worker clears the other's in-memory copy too."""
+        self.first.set('products', 'etag', b'body')
+        self.second.get('products', 'etag')
+        self.first.set('suppliers', 'etag', b'suppliers')
+        self.first.invalidate('products')
+        self.assertTrue(wait_for(lambda: self.second.local.get('products', 'etag') is None))
+        self.assertIsNone(self.second.get('products', 'etag'))
+        self.assertEqual(self.second.get('suppliers', 'etag'), b'suppliers')
+    
+    def test_server_errors_are_misses(self):
+        """An unreachable server degrades to cache misses, not failed requests."""
+        self.server.down = True
+        self.assertIsNone(self.first.get('products', 'etag'))
+        self.first.set('products', 'etag', b'body')
+        self.first.invalidate('products')
+        self.assertEqual(self.first.stats()['errors'], 3)
+
+
+class TestListingCache(ApiTestCase):
+    """Listings are served from the cache until a write invalidates them."""
+    
+    def count_selects(self, url):
+        """Request url and return its JSON body and the number of SELECTs on the listed data."""
+        statements = []
+        with self.app.app_context():
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = self.client.get(url, headers=self.headers)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(response.status_code, 200)
+        listing = [s for s in statements if 'table_versions' not in s and 'users' not in s]
+        return response.get_json(), len(listing)
+    
+    def test_local_cache_is_the_default(self):
+        """Without CACHE_URL listings use the in-process backend."""
+        self.assertIsInstance(self.app.extensions['listing_cache'], LocalCache)
+    
+    def test_repeat_listing_skips_the_query(self):
+        """A second client gets the cached body; a write brings fresh data."""
+        product = self.create_product('A', quantity=1, threshold=5)
+        for url in ['/api/products/', '/api/transactions/low-stock', '/api/suppliers/']:
+            self.count_selects(url)
+            _, selects = self.count_selects(url)
+            self.assertEqual(selects, 0, url)
+        
+        self.client.post('/api/transactions/', json={
+            'product_id': product, 'type': 'in', 'quantity': 10
+        }, headers=self.headers)
+        body, _ = self.count_selects('/api/products/')
+        self.assertEqual(body[0]['quantity'], 11)
+        self.assertEqual(self.count_selects('/api/transactions/low-stock')[0], [])
+    
+    def test_writes_in_one_worker_reach_another(self):
+        """With a shared server, a second app never serves the first's stale listing."""
+        server = FakeRedisServer()
+        self.app.extensions['listing_cache'] = RedisCache(server.client())
+        other = RedisCache(server.client())
+        other.listen()
+        
+        self.create_product('A')
+        self.count_selects('/api/products/')
+        self.assertEqual(len(server.hashes['kaiwhakarite:listing:products']), 1)
+        
+        other.set('products', 'stale', b'{}')
+        self.create_product('B')
+        self.assertNotIn('kaiwhakarite:listing:products', server.hashes)
+        self.assertTrue(wait_for(lambda: other.local.get('products', 'stale') is None))
+        body, _ = self.count_selects('/api/products/')
+        self.assertEqual([p['barcode'] for p in body], ['A', 'B'])
+
+
+if __name__ == '__main__':
+    unittest.main()
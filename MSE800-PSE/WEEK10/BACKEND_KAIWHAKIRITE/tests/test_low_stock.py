@@ -0,0 +1,56 @@
+"""
+Tests for the maintained low-stock flag behind /api/transactions/low-stock.
+"""
+
+import unittest
+from tests.base import ApiTestCase
+
+
+class TestLowStockFlag(ApiTestCase):
+    """Every write that can cross a threshold keeps the flag current."""
+    
+    def low_stock_ids(self):
+        """Return the ids reported by the low-stock endpoint."""
+        response = self.client.get('/api/transactions/low-stock', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [p['id'] for p in response.get_json()]
+    
+    def move_stock(self, product_id, type, quantity):
+        """Post a stock transaction and return the response."""
+        return self.client.post('/api/transactions/', json={
+            'product_id': product_id, 'type': type, 'quantity': quantity
+        }, headers=self.headers)
+    
+    def test_new_product_at_threshold_is_low(self):
+        """A product created at or below its threshold is listed immediately."""
+        low = self.create_product('A', quantity=5, threshold=5)
+        self.create_product('B', quantity=6, threshold=5)
+        self.create_product('C', quantity=0)
+        self.assertEqual(self.low_stock_ids(), [low])
+    
+    def test_transactions_cross_threshold(self):
+        """Stock out below the threshold flags it; stock in above clears it."""
+        product = self.create_product('A', quantity=10, threshold=5)
+        self.move_stock(product, 'out', 5)
+        self.assertEqual(self.low_stock_ids(), [product])
+        self.move_stock(product, 'in', 1)
+        self.assertEqual(self.low_stock_ids(), [])
+    
+    def test_update_threshold(self):
+        """Raising the threshold above the quantity flags the product."""
+        product = self.create_product('A', quantity=10, threshold=5)
+        self.client.put(f'/api/products/{product}', json={'threshold': 10},
+                        headers=self.headers)
+        self.assertEqual(self.low_stock_ids(), [product])
+    
+    def test_delete_and_restore(self):
+        """Deleted products drop out of the list and come back on restore."""
+        product = self.create_product('A', quantity=1, threshold=5)
+        self.client.delete(f'/api/products/{product}', headers=self.headers)
+        self.assertEqual(self.low_stock_ids(), [])
+        self.client.post(f'/api/products/{product}/restore', headers=self.headers)
+        self.assertEqual(self.low_stock_ids(), [product])
+
+
+if __name__ == '__main__':
+    unittest.main()
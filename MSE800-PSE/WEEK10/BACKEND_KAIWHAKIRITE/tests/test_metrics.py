@@ -0,0 +1,79 @@
+"""
+Tests for the per-endpoint query and latency metrics.
+"""
+
+import unittest
+from app.metrics import MetricsRegistry
+from tests.base import ApiTestCase
+
+
+def samples(text):
+    """Parse Prometheus text into {'name{labels}': value}."""
+    result = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            result[name] = float(value)
+    return result
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Histogram exposition follows the Prometheus text format."""
+    
+    def test_buckets_are_cumulative(self):
+        """Each bucket counts every observation at or below its bound."""
+        registry = MetricsRegistry()
+        for seconds in [0.001, 0.003, 0.2, 30]:
+            registry.observe_request('products.get_products', 'GET', 200, seconds, 2, 0.0005)
+        metrics = samples(registry.render())
+        labels = 'endpoint="products.get_products",method="GET"'
+        bucket = f'kaiwhakarite_http_request_duration_seconds_bucket{{{labels},le='
+        self.assertEqual(metrics[bucket + '"0.001"}'], 1)
+        self.assertEqual(metrics[bucket + '"0.005"}'], 2)
+        self.assertEqual(metrics[bucket + '"10.0"}'], 3)
+        self.assertEqual(metrics[bucket + '"+Inf"}'], 4)
+        self.assertEqual(metrics[f'kaiwhakarite_db_queries_total{{{labels}}}'], 8)
+    
+    def test_label_values_are_escaped(self):
+        """Quotes and backslashes cannot break the exposition format."""
+        registry = MetricsRegistry()
+        registry.observe_request('a"b\\c', 'GET', 200, 0.01, 0, 0.0)
+        self.assertIn('endpoint="a\\"b\\\\c"', registry.render())
+
+
+class TestMetricsEndpoint(ApiTestCase):
+    """Requests through the app show up at /api/_metrics."""
+    
+    def test_counts_queries_per_endpoint(self):
+        """Query counts and request totals are attributed to the right endpoint."""
+        self.create_product('A')
+        self.client.get('/api/transactions/', headers=self.headers)
+        self.client.get('/api/transactions/', headers=self.headers)
+        self.client.get('/api/no-such-route')
+        
+        response = self.client.get('/api/_metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        metrics = samples(response.get_data(as_text=True))
+        
+        labels = 'endpoint="transactions.get_transactions",method="GET"'
+        self.assertEqual(metrics[f'kaiwhakarite_http_requests_total{{{labels},status="200"}}'], 2)
+        self.assertEqual(metrics[f'kaiwhakarite_db_queries_per_request_count{{{labels}}}'], 2)
+        # archive horizon lookup + the listing itself, per request
+        self.assertEqual(metrics[f'kaiwhakarite_db_queries_total{{{labels}}}'], 4)
+        self.assertGreater(metrics[f'kaiwhakarite_http_request_duration_seconds_sum{{{labels}}}'], 0)
+        self.assertIn('kaiwhakarite_http_requests_total{endpoint="unmatched",method="GET",status="404"}',
+                      metrics)
+    
+    def test_streamed_queries_are_counted(self):
+        """Statements run while streaming a body still count for the request."""
+        self.create_product('A')
+        self.client.get('/api/products/', headers={**self.headers, 'Accept': 'application/x-ndjson'})
+        metrics = samples(self.client.get('/api/_metrics').get_data(as_text=True))
+        labels = 'endpoint="products.get_products",method="GET"'
+        # version read for the ETag + the streamed listing
+        self.assertEqual(metrics[f'kaiwhakarite_db_queries_total{{{labels}}}'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
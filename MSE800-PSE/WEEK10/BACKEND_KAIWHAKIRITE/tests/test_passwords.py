@@ -0,0 +1,73 @@
+"""
+Tests for the bounded password hasher and hash upgrades at login.
+"""
+
+import threading
+import unittest
+from app.models.models import User
+from app.passwords import PasswordHasher, PasswordHasherBusy
+from tests.base import ApiTestCase
+
+
+class TestPasswordHasher(unittest.TestCase):
+    """Hashing happens on the pool and the pool is bounded."""
+    
+    def test_hash_and_verify(self):
+        """Hashes use the configured method and verify as usual."""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000')
+        password_hash = hasher.hash('kupuhuna')
+        self.assertTrue(password_hash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(hasher.verify(password_hash, 'kupuhuna'))
+        self.assertFalse(hasher.verify(password_hash, 'wrong'))
+        self.assertFalse(hasher.needs_rehash(password_hash))
+        self.assertTrue(hasher.needs_rehash(PasswordHasher('pbkdf2:sha256:2000').hash('x')))
+        hasher.shutdown()
+    
+    def test_full_pool_raises_busy(self):
+        """Callers beyond workers + queue_limit are turned away."""
+        hasher = PasswordHasher(workers=1, queue_limit=0, wait_timeout=0.05)
+        release = threading.Event()
+        started = threading.Event()
+        
+        def slow():
+            started.set()
+            release.wait()
+        
+        blocker = threading.Thread(target=hasher._run, args=(slow,))
+        blocker.start()
+        started.wait()
+        with self.assertRaises(PasswordHasherBusy):
+            hasher.hash('x')
+        release.set()
+        blocker.join()
+        self.assertTrue(hasher.hash('x'))
+        hasher.shutdown()
+
+
+class TestHashUpgradeOnLogin(ApiTestCase):
+    """Changing the hash parameters upgrades stored hashes on next login."""
+    
+    def stored_hash(self):
+        """The stored hash of the test user."""
+        with self.app.app_context():
+            return User.query.filter_by(username='rangatira').one().password_hash
+    
+    def test_login_rehashes_with_new_parameters(self):
+        """The old hash still works once, and is replaced by the new method."""
+        self.assertTrue(self.stored_hash().startswith('pbkdf2:sha256:1000$'))
+        self.app.extensions['password_hasher'] = PasswordHasher(method='pbkdf2:sha256:1500')
+        
+        response = self.client.post('/api/auth/login', json={
+            'username': 'rangatira', 'password': 'kupuhuna'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2:sha256:1500$'))
+        
+        response = self.client.post('/api/auth/login', json={
+            'username': 'rangatira', 'password': 'wrong'
+        })
+        self.assertEqual(response.status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
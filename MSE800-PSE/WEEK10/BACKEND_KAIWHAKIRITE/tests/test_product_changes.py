@@ -0,0 +1,90 @@
+"""
+Tests for the product delta-sync feed.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from app import db
+from app.models.models import Product, TableVersion
+from tests.base import ApiTestCase
+
+
+class TestProductChanges(ApiTestCase):
+    """A client holding a watermark only receives what changed after it."""
+    
+    def changes(self, since=None, limit=None):
+        """Fetch one page of the change feed."""
+        params = {}
+        if since:
+            params['since'] = since
+        if limit:
+            params['limit'] = limit
+        response = self.client.get('/api/products/changes', query_string=params,
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+    
+    def test_initial_sync_pages_through_everything(self):
+        """Without a watermark the feed replays the catalog in pages."""
+        ids = [self.create_product(str(n)) for n in range(3)]
+        page = self.changes(limit=2)
+        self.assertTrue(page['has_more'])
+        rest = self.changes(page['next_since'], limit=2)
+        self.assertFalse(rest['has_more'])
+        self.assertEqual([c['id'] for c in page['changes'] + rest['changes']], ids)
+    
+    def test_only_changed_rows_after_watermark(self):
+        """Edits, stock movements and soft deletes each show up once."""
+        edited = self.create_product('A')
+        moved = self.create_product('B', quantity=5)
+        deleted = self.create_product('C')
+        self.create_product('D')
+        watermark = self.changes()['next_since']
+        
+        self.client.put(f'/api/products/{edited}', json={'name': 'Renamed'}, headers=self.headers)
+        self.client.post('/api/transactions/', json={
+            'product_id': moved, 'type': 'out', 'quantity': 2
+        }, headers=self.headers)
+        self.client.delete(f'/api/products/{deleted}', headers=self.headers)
+        
+        feed = self.changes(watermark)
+        self.assertEqual([c['id'] for c in feed['changes']], [edited, moved, deleted])
+        self.assertEqual(feed['changes'][0]['name'], 'Renamed')
+        self.assertEqual(feed['changes'][1]['quantity'], 3)
+        self.assertEqual(set(feed['changes'][2]), {'id', 'is_deleted', 'updated_at'})
+        
+        self.assertEqual(self.changes(feed['next_since'])['changes'], [])
+    
+    def test_late_commit_with_older_timestamp_is_not_missed(self):
+        """A write stamped before the watermark but committed after it still shows up."""
+        late = self.create_product('A')
+        self.create_product('B')
+        watermark = self.changes()['next_since']
+        
+        # A writer that took its updated_at before B's write and only
+        # committed now (e.g. after waiting for the write lock)
+        with self.app.app_context():
+            TableVersion.bump('products')
+            products = Product.__table__
+            db.session.execute(products.update().where(products.c.id == late).values(
+                name='Late', updated_at=datetime.utcnow() - timedelta(hours=1)))
+            db.session.commit()
+        
+        feed = self.changes(watermark)
+        self.assertEqual([c['id'] for c in feed['changes']], [late])
+        self.assertEqual(feed['changes'][0]['name'], 'Late')
+    
+    def test_old_timestamp_watermark_restarts_sync(self):
+        """Watermarks from the earlier updated_at format replay the whole catalog."""
+        ids = [self.create_product(str(n)) for n in range(2)]
+        feed = self.changes(f'{datetime.utcnow().isoformat()},{ids[-1]}')
+        self.assertEqual([c['id'] for c in feed['changes']], ids)
+    
+    def test_invalid_watermark(self):
+        """Malformed watermarks are rejected."""
+        response = self.client.get('/api/products/changes?since=yesterday', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
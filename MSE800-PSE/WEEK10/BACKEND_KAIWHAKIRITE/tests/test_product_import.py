@@ -0,0 +1,112 @@
+"""
+Tests for CSV product import.
+"""
+
+import io
+import unittest
+from app import db
+from app.routes import products
+from tests.base import ApiTestCase
+
+
+class WatchedUpload(io.BytesIO):
+    """Request body that notes whether a transaction is open at each read."""
+    
+    def __init__(self, data):
+        super().__init__(data)
+        self.open_transaction = []
+    
+    def readinto(self, buffer):
+        self.open_transaction.append(db.session().in_transaction())
+        return super().readinto(buffer)
+
+
+class TestProductImport(ApiTestCase):
+    """Imports insert new barcodes and report everything they skip."""
+    
+    def upload(self, text):
+        """POST text as a CSV file upload."""
+        return self.client.post('/api/products/import', headers=self.headers,
+                                data={'file': (io.BytesIO(text.encode()), 'products.csv')},
+                                content_type='multipart/form-data')
+    
+    def upload_bytes(self, body):
+        """POST raw bytes as a CSV file upload."""
+        return self.client.post('/api/products/import', headers=self.headers,
+                                data={'file': (io.BytesIO(body), 'products.csv')},
+                                content_type='multipart/form-data')
+    
+    def test_import_with_duplicates_across_chunks(self):
+        """Existing, repeated and invalid rows are skipped; the rest are inserted."""
+        self.create_product('EXISTING')
+        original = products.IMPORT_CHUNK_SIZE
+        products.IMPORT_CHUNK_SIZE = 2
+        try:
+            response = self.upload(
+                'name,barcode,quantity,threshold,category\n'
+                'Rēwena,R1,5,10,bakery\n'
+                'Old,EXISTING,1,,\n'
+                'Paraoa,P1,,,bakery\n'
+                'Again,R1,3,,\n'
+                ',NONAME,1,,\n'
+                'Bad,BAD,lots,,\n'
+            )
+        finally:
+            products.IMPORT_CHUNK_SIZE = original
+        
+        self.assertEqual(response.status_code, 201)
+        report = response.get_json()
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['skipped'], [{'line': 3, 'barcode': 'EXISTING'},
+                                             {'line': 5, 'barcode': 'R1'}])
+        self.assertEqual([e['line'] for e in report['errors']], [6, 7])
+        
+        listed = self.client.get('/api/products/', headers=self.headers).get_json()
+        by_barcode = {p['barcode']: p for p in listed}
+        self.assertEqual(sorted(by_barcode), ['EXISTING', 'P1', 'R1'])
+        self.assertEqual(by_barcode['R1']['name'], 'Rēwena')
+        self.assertEqual(by_barcode['P1']['quantity'], 0)
+        
+        low = self.client.get('/api/transactions/low-stock', headers=self.headers).get_json()
+        self.assertEqual([p['name'] for p in low], ['Rēwena'])
+    
+    def test_each_chunk_commits_before_reading_on(self):
+        """No write transaction stays open while the rest of the file arrives."""
+        body = ('name,barcode,quantity\n' + ''.join(
+            f'Product {n},B{n:06d},{n}\n' for n in range(3000))).encode()
+        upload = WatchedUpload(body)
+        response = self.client.post('/api/products/import', headers=self.headers,
+                                    input_stream=upload, content_type='text/csv',
+                                    content_length=len(body))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['imported'], 3000)
+        self.assertGreater(len(upload.open_transaction), 2)
+        self.assertFalse(any(upload.open_transaction))
+    
+    def test_undecodable_byte_after_first_chunk(self):
+        """A bad byte stops the import with a 400 that says how far it got."""
+        rows = [f'Product {n},B{n:06d},1\n'.encode() for n in range(1200)]
+        body = b'name,barcode,quantity\n' + b''.join(rows) + b'Bad \xff,BAD,1\n'
+        response = self.upload_bytes(body)
+        
+        self.assertEqual(response.status_code, 400)
+        report = response.get_json()
+        self.assertIn('utf-8', report['error'])
+        self.assertGreaterEqual(report['imported'], products.IMPORT_CHUNK_SIZE)
+        # Every line before the stop was imported and committed, none after it
+        self.assertEqual(report['imported'], report['stopped_at_line'] - 2)
+        listed = self.client.get('/api/products/', headers=self.headers).get_json()
+        self.assertEqual(len(listed), report['imported'])
+        
+        # Resending from the reported line completes the file
+        rest = b'name,barcode,quantity\n' + b''.join(rows[report['imported']:])
+        self.assertEqual(self.upload_bytes(rest).get_json()['imported'],
+                         1200 - report['imported'])
+    
+    def test_missing_required_columns(self):
+        """A header without barcode is rejected outright."""
+        self.assertEqual(self.upload('name,quantity\nA,1\n').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
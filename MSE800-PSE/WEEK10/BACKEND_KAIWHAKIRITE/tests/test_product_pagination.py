@@ -0,0 +1,80 @@
+"""
+Tests for keyset pagination and NDJSON streaming of GET /api/products.
+"""
+
+import json
+import unittest
+from app.routes.products import MAX_PAGE_SIZE, NDJSON_MIMETYPE
+from tests.base import ApiTestCase
+
+
+class TestProductPagination(ApiTestCase):
+    """limit/after pages walk the catalog in id order; NDJSON streams the same rows."""
+    
+    def setUp(self):
+        """Five products, the third of them soft-deleted."""
+        super().setUp()
+        self.ids = [self.create_product(f'P{n}', quantity=n) for n in range(5)]
+        self.client.delete(f'/api/products/{self.ids[2]}', headers=self.headers)
+        self.live = [id for id in self.ids if id != self.ids[2]]
+    
+    def page(self, **args):
+        """GET one page of products with the given query arguments."""
+        return self.client.get('/api/products/', query_string=args, headers=self.headers)
+    
+    def stream(self, **args):
+        """GET the listing as NDJSON; returns the decoded lines."""
+        response = self.client.get('/api/products/', query_string=args,
+                                   headers={**self.headers, 'Accept': NDJSON_MIMETYPE})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, NDJSON_MIMETYPE)
+        lines = response.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines]
+    
+    def test_pages_follow_id_order(self):
+        """Following X-Next-After visits every live product once, in id order."""
+        seen, args = [], {'limit': 2}
+        while True:
+            response = self.page(**args)
+            self.assertEqual(response.status_code, 200)
+            seen += [p['id'] for p in response.get_json()]
+            if 'X-Next-After' not in response.headers:
+                break
+            args['after'] = response.headers['X-Next-After']
+        self.assertEqual(seen, self.live)
+    
+    def test_next_after_only_on_full_pages(self):
+        """A short last page and an unpaged listing carry no X-Next-After."""
+        full = self.page(limit=2)
+        self.assertEqual(full.headers['X-Next-After'], str(self.live[1]))
+        short = self.page(limit=3, after=self.live[1])
+        self.assertEqual([p['id'] for p in short.get_json()], self.live[2:])
+        self.assertNotIn('X-Next-After', short.headers)
+        self.assertNotIn('X-Next-After', self.page().headers)
+    
+    def test_bad_limit_or_after(self):
+        """Non-integer or out-of-range arguments are a 400."""
+        for args in ({'limit': 0}, {'limit': MAX_PAGE_SIZE + 1}, {'limit': -1},
+                     {'limit': 'ten'}, {'after': 'x'}):
+            with self.subTest(args=args):
+                response = self.page(**args)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+    
+    def test_ndjson_one_product_per_line(self):
+        """Each line is one product object, with the same filters as the JSON listing."""
+        products = self.stream()
+        self.assertEqual([p['id'] for p in products], self.live)
+        self.assertEqual(products, self.page().get_json())
+        
+        everything = self.stream(include_deleted='true')
+        self.assertEqual([p['id'] for p in everything], self.ids)
+        self.assertEqual([p['is_deleted'] for p in everything],
+                         [False, False, True, False, False])
+        
+        self.assertEqual([p['id'] for p in self.stream(limit=2, after=self.live[0])],
+                         self.live[1:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Tests for full-text product search.
+"""
+
+import unittest
+from app import db
+from app.models.models import Product
+from tests.base import ApiTestCase
+
+
+class TestProductSearch(ApiTestCase):
+    """The FTS5 index follows every product write and ranks name matches first."""
+    
+    def search(self, q, **params):
+        """Run a search and return the matching product ids."""
+        response = self.client.get('/api/products/search', query_string={'q': q, **params},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.get_json())
+        return [p['id'] for p in response.get_json()]
+    
+    def test_prefix_and_all_words(self):
+        """Each word matches as a prefix and every word must match."""
+        milk = self.create_product('111', name='Chocolate milk', category='Dairy')
+        self.create_product('222', name='Dark chocolate', category='Confectionery')
+        self.assertEqual(self.search('choc mil'), [milk])
+        self.assertEqual(len(self.search('choc')), 2)
+        self.assertEqual(self.search('dair'), [milk])
+        self.assertEqual(self.search('111'), [milk])
+    
+    def test_name_hits_rank_above_description_hits(self):
+        """A word in the name outranks the same word in a description."""
+        described = self.create_product('1', name='Biscuits', description='Goes well with tea')
+        named = self.create_product('2', name='Green tea')
+        self.assertEqual(self.search('tea'), [named, described])
+    
+    def test_index_follows_updates_and_deletes(self):
+        """Renames, soft deletes and hard deletes are reflected immediately."""
+        product = self.create_product('1', name='Kumara')
+        self.client.put(f'/api/products/{product}', json={'name': 'Taro'}, headers=self.headers)
+        self.assertEqual(self.search('kumara'), [])
+        self.assertEqual(self.search('taro'), [product])
+        
+        self.client.delete(f'/api/products/{product}', headers=self.headers)
+        self.assertEqual(self.search('taro'), [])
+        self.assertEqual(self.search('taro', include_deleted='true'), [product])
+        
+        with self.app.app_context():
+            db.session.delete(db.session.get(Product, product))
+            db.session.commit()
+        self.assertEqual(self.search('taro', include_deleted='true'), [])
+    
+    def test_deleted_hits_do_not_shorten_the_page(self):
+        """Live matches ranked below soft-deleted ones still fill the page."""
+        for n in range(3):
+            deleted = self.create_product(f'D{n}', name='Feijoa')
+            self.client.delete(f'/api/products/{deleted}', headers=self.headers)
+        live = self.create_product('L', name='Jam', description='Made with feijoa')
+        self.assertEqual(self.search('feijoa', limit=1), [live])
+    
+    def test_punctuation_is_not_query_syntax(self):
+        """FTS operators and quotes in user input cannot break the query."""
+        product = self.create_product('1', name='Rock "n" roll')
+        self.assertEqual(self.search('rock ("n*'), [product])
+        response = self.client.get('/api/products/search', query_string={'q': '"*'},
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+"""
+Query-budget regression tests for every route of the API blueprints.
+Each route is called against a small and a larger seeded dataset; it must
+stay within its declared SQL statement budget, issue the same number of
+statements at both sizes (no N+1 loops) and answer within its time budget.
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from app.archive import archive_stale_rows
+from app.models.models import Product, StockTransaction, Supplier, User
+from app.rollups import rebuild_rollups
+from app.snapshots import take_stock_snapshot
+from tests.base import TEST_CONFIG
+
+# The events blueprint is left out: its stream never ends and runs no SQL
+# (tests/test_events.py checks that)
+BLUEPRINTS = ('auth', 'products', 'suppliers', 'transactions')
+SMALL, LARGE = 3, 30
+TIME_BUDGET_MS = 1000
+
+# (endpoint, variant, expected status, max SQL statements, request builder).
+# Builders take the seeded ids and return (method, url, keyword arguments for
+# the test client). Reads come first; writes only touch spare rows.
+ROUTES = [
+    ('auth.get_current_user', '', 200, 0, lambda ids: ('get', '/api/auth/me', {})),
+    ('auth.login', '', 200, 1, lambda ids: ('post', '/api/auth/login', {
+        'json': {'username': 'rangatira', 'password': 'kupuhuna'}})),
+    ('products.get_products', '', 200, 2, lambda ids: ('get', '/api/products/', {})),
+    ('products.get_products', 'page', 200, 2, lambda ids: ('get', '/api/products/', {
+        'query_string': {'limit': 5, 'after': ids['product']}})),
+    ('products.get_products', 'include_deleted', 200, 2, lambda ids: ('get', '/api/products/', {
+        'query_string': {'include_deleted': 'true'}})),
+    ('products.get_products', 'ndjson', 200, 2, lambda ids: ('get', '/api/products/', {
+        'headers': {'Accept': 'application/x-ndjson'}})),
+    ('products.get_product_changes', '', 200, 1, lambda ids: ('get', '/api/products/changes', {})),
+    # a page that is not full costs one extra count of the index
+    ('products.search_products', '', 200, 2, lambda ids: ('get', '/api/products/search', {
+        'query_string': {'q': 'product'}})),
+    ('products.get_product_forecast', '', 200, 2, lambda ids: (
+        'get', '/api/products/forecast', {'query_string': {'days': 365}})),
+    ('products.get_product_by_barcode', '', 200, 1, lambda ids: (
+        'get', f"/api/products/barcode/{ids['barcode']}", {})),
+    ('products.get_cache_stats', '', 200, 0, lambda ids: ('get', '/api/products/cache-stats', {})),
+    ('suppliers.get_suppliers', '', 200, 2, lambda ids: ('get', '/api/suppliers/', {})),
+    ('suppliers.get_supplier_summary', '', 200, 3, lambda ids: (
+        'get', '/api/suppliers/summary', {})),
+    ('transactions.get_transactions', '', 200, 2, lambda ids: ('get', '/api/transactions/', {})),
+    ('transactions.get_transactions', 'recent', 200, 2, lambda ids: ('get', '/api/transactions/', {
+        'query_string': {'start_date': (datetime.utcnow() - timedelta(days=30)).isoformat()}})),
+    ('transactions.export_transactions', 'csv', 200, 2, lambda ids: (
+        'get', '/api/transactions/export', {'query_string': {'format': 'csv'}})),
+    ('transactions.get_low_stock_products', '', 200, 2, lambda ids: (
+        'get', '/api/transactions/low-stock', {})),
+    ('transactions.get_stock_as_of', '', 200, 5, lambda ids: (
+        'get', '/api/transactions/stock-as-of', {'query_string': {
+            'product_id': ids['product'],
+            'date': (datetime.utcnow() - timedelta(days=10)).date().isoformat()}})),
+    ('transactions.get_stock_movement', '', 200, 1, lambda ids: (
+        'get', '/api/transactions/movement', {'query_string': {'period': 'week'}})),
+    ('auth.register', '', 201, 2, lambda ids: ('post', '/api/auth/register', {
+        'json': {'username': 'budget-user', 'password': 'budget-password'}})),
+    ('products.create_product', '', 201, 4, lambda ids: ('post', '/api/products/', {
+        'json': {'name': 'Budget product', 'barcode': 'BUDGET-NEW'}})),
+    ('products.import_products', '', 201, 3, lambda ids: ('post', '/api/products/import', {
+        'data': 'name,barcode,quantity\nImported 1,IMP-1,3\nImported 2,IMP-2,4\n',
+        'content_type': 'text/csv'})),
+    ('products.update_product', '', 200, 3, lambda ids: ('put', f"/api/products/{ids['product']}", {
+        'json': {'threshold': 500}})),
+    ('products.delete_product', '', 200, 3, lambda ids: (
+        'delete', f"/api/products/{ids['spare_product']}", {})),
+    ('products.restore_product', '', 200, 3, lambda ids: (
+        'post', f"/api/products/{ids['deleted_product']}/restore", {})),
+    ('transactions.create_transaction', '', 201, 5, lambda ids: ('post', '/api/transactions/', {
+        'json': {'product_id': ids['product'], 'type': 'in', 'quantity': 5}})),
+    # the quantities written are read back so responses and events match them
+    ('transactions.create_transaction_batch', '', 201, 7, lambda ids: (
+        'post', '/api/transactions/batch', {'json': {'transactions': [
+            {'product_id': ids['product'], 'type': 'in', 'quantity': 2},
+            {'product_id': ids['product'], 'type': 'out', 'quantity': 1}]}})),
+    ('suppliers.create_supplier', '', 201, 4, lambda ids: ('post', '/api/suppliers/', {
+        'json': {'name': 'Budget supplier'}})),
+    ('suppliers.update_supplier', '', 200, 3, lambda ids: (
+        'put', f"/api/suppliers/{ids['supplier']}", {'json': {'phone': '021 000 000'}})),
+    ('suppliers.delete_supplier', '', 200, 4, lambda ids: (
+        'delete', f"/api/suppliers/{ids['spare_supplier']}", {})),
+]
+
+
+def seed(size):
+    """Suppliers, products and two years of transactions scaled by size; returns ids."""
+    now = datetime.utcnow()
+    admin = User.query.filter_by(username='rangatira').one()
+    suppliers = [Supplier(name=f'Supplier {n}') for n in range(size + 1)]
+    db.session.add_all(suppliers)
+    db.session.flush()
+    
+    products = []
+    for n in range(size * 4):
+        product = Product(name=f'Product {n}', barcode=f'B{n:05d}', quantity=20 + n,
+                          threshold=25, category=f'Category {n % 3}', description='Seeded product',
+                          supplier_id=suppliers[n % size].id,
+                          created_at=now - timedelta(days=800))
+        product.refresh_low_stock()
+        products.append(product)
+    old_deleted = Product(name='Old deleted product', barcode='OLD', quantity=0,
+                          is_deleted=True, updated_at=now - timedelta(days=400))
+    deleted = Product(name='Deleted product', barcode='DELETED', quantity=0, is_deleted=True)
+    db.session.add_all(products + [old_deleted, deleted])
+    db.session.flush()
+    
+    for product in products:
+        for days in (700, 400, 60, 5):
+            db.session.add(StockTransaction(product_id=product.id, user_id=admin.id, type='in',
+                                            quantity=2, date=now - timedelta(days=days)))
+    db.session.commit()
+    
+    take_stock_snapshot()
+    rebuild_rollups()
+    archive_stale_rows(product_days=90, transaction_days=365)
+    return {
+        'product': products[0].id,
+        'spare_product': products[-1].id,
+        'deleted_product': deleted.id,
+        'barcode': products[1].barcode,
+        'supplier': suppliers[0].id,
+        'spare_supplier': suppliers[-1].id,
+    }
+
+
+def measure(size):
+    """Seed a fresh app at size and run every route once; returns {(endpoint, variant): result}."""
+    app = create_app(TEST_CONFIG)
+    client = app.test_client()
+    client.post('/api/auth/register', json={
+        'username': 'rangatira', 'password': 'kupuhuna', 'role': 'rangatira'})
+    token = client.post('/api/auth/login', json={
+        'username': 'rangatira', 'password': 'kupuhuna'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    
+    results = {}
+    with app.app_context():
+        ids = seed(size)
+        db.session.remove()
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            for endpoint, variant, status, budget, build in ROUTES:
+                method, url, kwargs = build(ids)
+                kwargs['headers'] = {**headers, **kwargs.get('headers', {})}
+                del statements[:]
+                started = time.perf_counter()
+                response = getattr(client, method)(url, **kwargs)
+                response.get_data()
+                elapsed = (time.perf_counter() - started) * 1000
+                results[(endpoint, variant)] = {
+                    'status': response.status_code,
+                    'queries': len(statements),
+                    'ms': elapsed,
+                    'statements': list(statements),
+                }
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+    return results
+
+
+class TestQueryBudgets(unittest.TestCase):
+    """Every API route has a fixed, declared SQL budget independent of data size."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Run the whole route table against both dataset sizes once."""
+        cls.small = measure(SMALL)
+        cls.large = measure(LARGE)
+    
+    def test_every_route_has_a_budget(self):
+        """New routes must be added to ROUTES before they can ship."""
+        app = create_app(TEST_CONFIG)
+        endpoints = {rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint.split('.')[0] in BLUEPRINTS}
+        self.assertEqual(endpoints - {endpoint for endpoint, *_ in ROUTES}, set())
+        with app.app_context():
+            db.engine.dispose()
+    
+    def test_routes_stay_within_budget(self):
+        """Status, statement count and wall time of each route on the larger dataset."""
+        for endpoint, variant, status, budget, _ in ROUTES:
+            with self.subTest(endpoint=endpoint, variant=variant):
+                result = self.large[(endpoint, variant)]
+                self.assertEqual(result['status'], status)
+                self.assertLessEqual(result['queries'], budget, '\n'.join(result['statements']))
+                self.assertLess(result['ms'], TIME_BUDGET_MS)
+    
+    def test_queries_do_not_grow_with_data(self):
+        """Ten times the rows must not mean more statements (no per-row lazy loads)."""
+        for endpoint, variant, *_ in ROUTES:
+            with self.subTest(endpoint=endpoint, variant=variant):
+                small = self.small[(endpoint, variant)]
+                large = self.large[(endpoint, variant)]
+                self.assertLessEqual(large['queries'], small['queries'],
+                                     '\n'.join(large['statements']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Tests for the daily/weekly stock movement rollups.
+"""
+
+import unittest
+from datetime import datetime
+from app.models.models import StockMovementRollup
+from app.rollups import period_start, rebuild_rollups
+from tests.base import ApiTestCase
+
+
+class TestMovementRollups(ApiTestCase):
+    """Rollups are updated as transactions are recorded and match a full rebuild."""
+    
+    def movement(self, **params):
+        """Fetch movement totals."""
+        response = self.client.get('/api/transactions/movement', query_string=params,
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+    
+    def rollup_rows(self):
+        """Every rollup row as comparable tuples."""
+        with self.app.app_context():
+            return sorted((r.period, r.period_start, r.product_id, r.type, r.quantity, r.count)
+                          for r in StockMovementRollup.query.all())
+    
+    def test_week_starts_on_monday(self):
+        """Weekly buckets are keyed by the Monday of the week."""
+        self.assertEqual(str(period_start('week', datetime(2024, 3, 10, 18))), '2024-03-04')
+        self.assertEqual(str(period_start('week', datetime(2024, 3, 11))), '2024-03-11')
+        self.assertEqual(str(period_start('day', datetime(2024, 3, 10, 18))), '2024-03-10')
+    
+    def test_single_and_batch_transactions_roll_up(self):
+        """Totals per product and for all products, for days and weeks."""
+        flour = self.create_product('FLOUR', quantity=10)
+        sugar = self.create_product('SUGAR', quantity=10)
+        self.client.post('/api/transactions/', json={
+            'product_id': flour, 'type': 'out', 'quantity': 4
+        }, headers=self.headers)
+        self.client.post('/api/transactions/batch', json={'transactions': [
+            {'product_id': flour, 'type': 'in', 'quantity': 6},
+            {'product_id': flour, 'type': 'out', 'quantity': 1},
+            {'product_id': sugar, 'type': 'out', 'quantity': 2},
+        ]}, headers=self.headers)
+        
+        today = datetime.utcnow().date().isoformat()
+        self.assertEqual(self.movement(product_id=flour), [
+            {'period_start': today, 'type': 'in', 'quantity': 6, 'count': 1},
+            {'period_start': today, 'type': 'out', 'quantity': 5, 'count': 2},
+        ])
+        weekly = self.movement(period='week')
+        self.assertEqual([(r['type'], r['quantity'], r['count']) for r in weekly],
+                         [('in', 6, 1), ('out', 7, 3)])
+        self.assertEqual(self.movement(start_date='2000-01-01', end_date='2000-12-31'), [])
+        
+        incremental = self.rollup_rows()
+        with self.app.app_context():
+            rebuild_rollups()
+        self.assertEqual(self.rollup_rows(), incremental)
+    
+    def test_invalid_period(self):
+        """Only day and week are supported."""
+        response = self.client.get('/api/transactions/movement?period=month', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+    
+    def test_invalid_product_id(self):
+        """A product_id that is not an integer is a 400, not the all-products totals."""
+        response = self.client.get('/api/transactions/movement?product_id=abc',
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {'error': 'product_id must be an integer'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for the synthetic data generator.
+"""
+
+import unittest
+from sqlalchemy import case, func, select
+from app import db
+from app.models.models import (Product, StockMovementRollup, StockTransaction, Supplier,
+                               User)
+from app.seed import SEED_PASSWORD, seed_database
+from tests.base import ApiTestCase
+
+
+class TestSeedDatabase(ApiTestCase):
+    """Seeded data is consistent with what the API itself would have written."""
+    
+    def setUp(self):
+        """Seed a small dataset on top of the logged-in test user."""
+        super().setUp()
+        with self.app.app_context():
+            self.counts = seed_database(users=3, suppliers=4, products=50, transactions=2000)
+    
+    def test_requested_volumes(self):
+        """Every table gets the requested rows, plus restocks for oversold products."""
+        with self.app.app_context():
+            self.assertEqual(User.query.count(), 4)
+            self.assertEqual(Supplier.query.count(), 4)
+            self.assertEqual(Product.query.count(), 50)
+            self.assertEqual(StockTransaction.query.count(), self.counts['stock_transactions'])
+            self.assertGreaterEqual(self.counts['stock_transactions'], 2000)
+    
+    def test_quantities_match_movements(self):
+        """Each product's stock is its net movement; flags and rollups agree."""
+        with self.app.app_context():
+            net = dict(db.session.execute(
+                select(StockTransaction.product_id, func.sum(case(
+                    (StockTransaction.type == 'in', StockTransaction.quantity),
+                    else_=-StockTransaction.quantity
+                ))).group_by(StockTransaction.product_id)
+            ).all())
+            for product in Product.query.all():
+                self.assertEqual(product.quantity, net.get(product.id, 0))
+                self.assertEqual(product.is_low_stock,
+                                 Product.is_low(product.quantity, product.threshold))
+            
+            units = db.session.execute(
+                select(func.sum(StockMovementRollup.quantity))
+                .where(StockMovementRollup.period == 'day', StockMovementRollup.product_id == 0)
+            ).scalar()
+            self.assertEqual(units, db.session.query(func.sum(StockTransaction.quantity)).scalar())
+    
+    def test_seeded_users_can_log_in_and_scan(self):
+        """Seeded users and barcodes work through the API."""
+        headers = self.login('seed-user-2', SEED_PASSWORD)
+        with self.app.app_context():
+            barcode = Product.query.first().barcode
+        response = self.client.get(f'/api/products/barcode/{barcode}', headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
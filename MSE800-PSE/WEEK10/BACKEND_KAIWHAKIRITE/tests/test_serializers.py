@@ -0,0 +1,79 @@
+"""
+Tests for the column-projected, fast-encoded listing responses.
+"""
+
+import json
+import unittest
+from flask import jsonify
+from app import serializers
+from app.models.models import Product
+from tests.base import ApiTestCase
+
+
+def orm_listing():
+    """The listing as it was built before: ORM objects turned into dicts."""
+    return [{
+        'id': p.id,
+        'name': p.name,
+        'description': p.description,
+        'quantity': p.quantity,
+        'category': p.category,
+        'unit': p.unit,
+        'threshold': p.threshold,
+        'supplier_id': p.supplier_id,
+        'barcode': p.barcode,
+        'is_deleted': p.is_deleted
+    } for p in Product.query.filter_by(is_deleted=False).order_by(Product.id).all()]
+
+
+class TestJsonResponse(ApiTestCase):
+    """json_response() output is byte-identical to jsonify() but for exponent-notation floats."""
+    
+    def assert_identical(self, payload):
+        """Both encoders produce the same body and mimetype."""
+        with self.app.test_request_context():
+            fast, reference = serializers.json_response(payload), jsonify(payload)
+            self.assertEqual(fast.get_data(), reference.get_data())
+            self.assertEqual(fast.mimetype, reference.mimetype)
+    
+    def test_listing_payloads(self):
+        """ASCII, non-ASCII, nulls, booleans and nesting."""
+        self.assert_identical([{'b': 1, 'a': None, 'c': True, 'd': 'plain'}])
+        self.assert_identical([{'name': 'Kūmara', 'notes': 'ā ē ī ō ū "quoted" \\ \n'}])
+        self.assert_identical({'z': [1, 2, {'y': False}], 'a': []})
+        self.assert_identical([])
+    
+    def test_floats(self):
+        """Plain floats match byte for byte; exponent notation only matches in value."""
+        self.assert_identical([{'rate': 0.5, 'days': 123.25, 'big': 1e15, 'sum': 0.1 + 0.2}])
+        for value in (1e16, 1e23, 1.5e-7, 1e-5):
+            with self.subTest(value=value), self.app.test_request_context():
+                fast = serializers.json_response({'days': value})
+                reference = jsonify({'days': value})
+                self.assertEqual(json.loads(fast.get_data()), json.loads(reference.get_data()))
+    
+    def test_without_orjson(self):
+        """The stdlib path is used when orjson is not installed."""
+        original = serializers.orjson
+        serializers.orjson = None
+        try:
+            self.assert_identical([{'b': 1, 'a': 'x'}])
+        finally:
+            serializers.orjson = original
+    
+    def test_debug_mode_keeps_pretty_output(self):
+        """Debug mode's indented output is left to jsonify."""
+        self.app.debug = True
+        self.assert_identical({'b': [1], 'a': 'x'})
+    
+    def test_product_listing_unchanged(self):
+        """The projected product listing equals the ORM-built one byte for byte."""
+        self.create_product('1', name='Rīwai', quantity=3, threshold=5, category='huawhenua')
+        self.create_product('2', name='Plain', description='no accents')
+        response = self.client.get('/api/products/', headers=self.headers)
+        with self.app.test_request_context():
+            self.assertEqual(response.get_data(), jsonify(orm_listing()).get_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Tests for stock snapshots and quantity-as-of-date queries.
+"""
+
+import unittest
+from datetime import datetime
+from app import db
+from app.models.models import Product, StockSnapshot, StockTransaction
+from app.snapshots import quantity_as_of, take_stock_snapshot
+from tests.base import ApiTestCase
+
+
+class TestQuantityAsOf(ApiTestCase):
+    """History is rebuilt from the nearest snapshot plus a tail of movements."""
+    
+    def setUp(self):
+        """A product created on 1 Jan with 10 units and a few months of movements."""
+        super().setUp()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.product = Product(name='Harakeke', barcode='H1', quantity=10,
+                               created_at=datetime(2024, 1, 1))
+        db.session.add(self.product)
+        db.session.flush()
+        for day, kind, quantity in [((1, 10), 'out', 3), ((2, 10), 'in', 8),
+                                    ((3, 10), 'out', 4), ((4, 10), 'out', 1)]:
+            db.session.add(StockTransaction(product_id=self.product.id, type=kind,
+                                            quantity=quantity, date=datetime(2024, *day)))
+        self.product.quantity = 10 - 3 + 8 - 4 - 1
+        db.session.commit()
+    
+    def tearDown(self):
+        """Leave the pushed app context before the base class cleans up."""
+        self.ctx.pop()
+        super().tearDown()
+    
+    def snapshot(self, month, quantity):
+        """Record a snapshot at the start of month."""
+        db.session.add(StockSnapshot(product_id=self.product.id,
+                                     taken_at=datetime(2024, month, 1), quantity=quantity))
+        db.session.commit()
+    
+    def test_without_snapshots_replays_back_from_live(self):
+        """No snapshot: work backwards from the current quantity."""
+        self.assertEqual(quantity_as_of(self.product, datetime(2024, 2, 15)), (15, 'live'))
+        self.assertEqual(quantity_as_of(self.product, datetime(2024, 1, 5)), (10, 'live'))
+    
+    def test_nearest_snapshot_either_side(self):
+        """Forward from an earlier snapshot or backward from a later one."""
+        self.snapshot(2, 7)
+        self.snapshot(4, 11)
+        self.assertEqual(quantity_as_of(self.product, datetime(2024, 2, 15)), (15, 'snapshot'))
+        self.assertEqual(quantity_as_of(self.product, datetime(2024, 3, 25)), (11, 'snapshot'))
+        self.assertEqual(quantity_as_of(self.product, datetime(2024, 5, 1)), (10, 'snapshot'))
+    
+    def test_before_creation(self):
+        """A product had no stock before it existed."""
+        self.assertEqual(quantity_as_of(self.product, datetime(2023, 12, 1))[0], 0)
+    
+    def test_take_snapshot_and_query_api(self):
+        """The snapshot job records live quantities and the API reads them."""
+        taken_at, rows = take_stock_snapshot()
+        self.assertEqual(rows, 1)
+        snapshot = StockSnapshot.query.one()
+        self.assertEqual((snapshot.taken_at, snapshot.quantity), (taken_at, 10))
+        
+        response = self.client.get('/api/transactions/stock-as-of', query_string={
+            'product_id': self.product.id, 'date': '2024-03-10'
+        }, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['quantity'], 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
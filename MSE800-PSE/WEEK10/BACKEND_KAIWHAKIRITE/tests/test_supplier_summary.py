@@ -0,0 +1,76 @@
+"""
+Tests for the per-supplier summary and supplier deletion.
+"""
+
+import unittest
+from sqlalchemy import event
+from app import db
+from tests.base import ApiTestCase
+
+
+class TestSupplierSummary(ApiTestCase):
+    """Counts per supplier come from one grouped query over live products."""
+    
+    def create_supplier(self, name):
+        """Create a supplier through the API and return its id."""
+        response = self.client.post('/api/suppliers/', json={'name': name}, headers=self.headers)
+        return response.get_json()['supplier_id']
+    
+    def capture_statements(self, method, url):
+        """Run one request and return its response and the SQL it executed."""
+        statements = []
+        with self.app.app_context():
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                response = getattr(self.client, method)(url, headers=self.headers)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+        return response, statements
+    
+    def test_summary_counts(self):
+        """Deleted products are excluded and empty suppliers report zeros."""
+        busy = self.create_supplier('Busy')
+        idle = self.create_supplier('Idle')
+        self.create_product('A', supplier_id=busy, quantity=5, threshold=10)
+        self.create_product('B', supplier_id=busy, quantity=20, threshold=10)
+        gone = self.create_product('C', supplier_id=busy, quantity=1, threshold=10)
+        self.client.delete(f'/api/products/{gone}', headers=self.headers)
+        
+        response, statements = self.capture_statements('get', '/api/suppliers/summary')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [
+            {'id': busy, 'name': 'Busy', 'product_count': 2, 'total_units': 25, 'low_stock_count': 1},
+            {'id': idle, 'name': 'Idle', 'product_count': 0, 'total_units': 0, 'low_stock_count': 0},
+        ])
+        self.assertEqual(len([s for s in statements if 'GROUP BY' in s]), 1)
+    
+    def test_summary_etag_follows_product_writes(self):
+        """A stock movement changes the summary's ETag."""
+        supplier = self.create_supplier('S')
+        product = self.create_product('A', supplier_id=supplier, quantity=5)
+        etag = self.client.get('/api/suppliers/summary', headers=self.headers).headers['ETag']
+        self.client.post('/api/transactions/', json={
+            'product_id': product, 'type': 'in', 'quantity': 1
+        }, headers=self.headers)
+        response = self.client.get('/api/suppliers/summary',
+                                   headers={**self.headers, 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()[0]['total_units'], 6)
+    
+    def test_delete_checks_products_with_exists(self):
+        """Deleting is refused while products reference the supplier, without loading them."""
+        supplier = self.create_supplier('S')
+        self.create_product('A', supplier_id=supplier)
+        response, statements = self.capture_statements('delete', f'/api/suppliers/{supplier}')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue([s for s in statements if 'EXISTS' in s])
+        self.assertFalse([s for s in statements if s.lstrip().startswith('SELECT products.id')])
+        
+        empty = self.create_supplier('Empty')
+        response = self.client.delete(f'/api/suppliers/{empty}', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
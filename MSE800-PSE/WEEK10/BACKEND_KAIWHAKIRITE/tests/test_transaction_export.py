@@ -0,0 +1,76 @@
+"""
+Tests for streamed CSV/Parquet export of stock transactions.
+"""
+
+import csv
+import io
+import unittest
+from tests.base import ApiTestCase
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class TestTransactionExport(ApiTestCase):
+    """Exports honour the listing filters and stream in batches."""
+    
+    def setUp(self):
+        """A product with a handful of movements."""
+        super().setUp()
+        self.product = self.create_product('A', quantity=100)
+        self.other = self.create_product('B', quantity=100)
+        for kind, quantity in [('out', 1), ('in', 2), ('out', 3)]:
+            self.client.post('/api/transactions/', json={
+                'product_id': self.product, 'type': kind, 'quantity': quantity, 'notes': 'a, "b"'
+            }, headers=self.headers)
+        self.client.post('/api/transactions/', json={
+            'product_id': self.other, 'type': 'out', 'quantity': 9
+        }, headers=self.headers)
+    
+    def export(self, **params):
+        """Request an export and return the response."""
+        response = self.client.get('/api/transactions/export', query_string=params,
+                                   headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_csv_matches_listing(self):
+        """The CSV has one row per transaction returned by the JSON listing."""
+        response = self.export(product_id=self.product, type='out')
+        self.assertTrue(response.is_streamed)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        
+        listing = self.client.get('/api/transactions/', query_string={
+            'product_id': self.product, 'type': 'out'
+        }, headers=self.headers).get_json()
+        self.assertEqual([int(r['id']) for r in rows], [t['id'] for t in listing])
+        self.assertEqual([r['quantity'] for r in rows], ['1', '3'])
+        self.assertEqual(rows[0]['notes'], 'a, "b"')
+        self.assertEqual(rows[0]['date'], listing[0]['date'])
+    
+    @unittest.skipUnless(pq, 'pyarrow is not installed')
+    def test_parquet_written_in_row_groups(self):
+        """Each batch becomes a row group of the Parquet file."""
+        from app.routes import transactions
+        original = transactions.EXPORT_BATCH_SIZE
+        transactions.EXPORT_BATCH_SIZE = 2
+        try:
+            response = self.export(format='parquet')
+        finally:
+            transactions.EXPORT_BATCH_SIZE = original
+        
+        parquet = pq.ParquetFile(io.BytesIO(response.data))
+        self.assertEqual(parquet.metadata.num_rows, 4)
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        self.assertEqual(parquet.read().column('quantity').to_pylist(), [1, 2, 3, 9])
+    
+    def test_unknown_format(self):
+        """Only csv and parquet are offered."""
+        response = self.client.get('/api/transactions/export?format=xlsx', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
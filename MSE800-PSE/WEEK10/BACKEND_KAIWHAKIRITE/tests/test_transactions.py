@@ -0,0 +1,65 @@
+"""
+Tests for request validation of POST /api/transactions.
+"""
+
+import unittest
+from tests.base import ApiTestCase
+
+
+class TestTransactionValidation(ApiTestCase):
+    """Malformed movements are refused with 400 before any stock changes."""
+    
+    def setUp(self):
+        """One product with stock on hand."""
+        super().setUp()
+        self.product = self.create_product('FLOUR', quantity=10)
+    
+    def post(self, body):
+        """Create one transaction and return the response."""
+        return self.client.post('/api/transactions/', json=body, headers=self.headers)
+    
+    def quantity(self):
+        """Current quantity of the product."""
+        response = self.client.get('/api/products/', headers=self.headers)
+        return response.get_json()[0]['quantity']
+    
+    def test_invalid_quantities_are_refused(self):
+        """Zero, negative, fractional, string and boolean quantities get a 400."""
+        for type in ('in', 'out'):
+            for quantity in (0, -5, 1.5, '3', True, None):
+                with self.subTest(type=type, quantity=quantity):
+                    response = self.post({'product_id': self.product, 'type': type,
+                                          'quantity': quantity})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.get_json(),
+                                     {'error': 'Quantity must be a positive integer'})
+        self.assertEqual(self.quantity(), 10)
+    
+    def test_invalid_type_is_refused(self):
+        """A missing or unknown type is a 400, not a server error."""
+        for body in ({'product_id': self.product, 'quantity': 1},
+                     {'product_id': self.product, 'type': 'sideways', 'quantity': 1}):
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json(), {'error': 'Invalid transaction type'})
+        self.assertEqual(self.quantity(), 10)
+    
+    def test_invalid_product_id_is_refused(self):
+        """true is not product 1, and ids must be JSON integers, not strings."""
+        for product_id in (True, str(self.product), None, 1.0):
+            with self.subTest(product_id=product_id):
+                response = self.post({'product_id': product_id, 'type': 'in', 'quantity': 1})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json(), {'error': 'product_id must be an integer'})
+        self.assertEqual(self.quantity(), 10)
+    
+    def test_valid_movement_still_applies(self):
+        """A positive integer quantity goes through as before."""
+        response = self.post({'product_id': self.product, 'type': 'out', 'quantity': 4})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.quantity(), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()